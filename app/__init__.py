@@ -18,21 +18,50 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
-    # 初始化扩展
+    # 初始化扩展（连接池参数需在创建引擎前写入配置）
+    from app import database
+    database.apply_engine_options(app)
     db.init_app(app)
+    database.init_app(app)
     login_manager.init_app(app)
     
+    # JSON 编解码（可选 orjson）
+    from app import json_provider
+    json_provider.init_app(app)
+    
+    # 密码哈希执行器（进程池）
+    from app import passwords
+    passwords.init_app(app)
+    
+    # 数据版本、任务计数与删除墓碑（注册事务提交钩子）
+    from app import versioning, counters, sync  # noqa: F401
+    
+    # 进程内组件（订阅 app.changes 的数据变更通知）
+    from app import suggest, category_cache, user_cache, page_cache, events
+    suggest.init_app(app)
+    category_cache.init_app(app)
+    user_cache.init_app(app)
+    page_cache.init_app(app)
+    events.init_app(app)
+    
+    # 响应压缩、预压缩静态文件与哈希命名的静态资源
+    from app import compression, assets
+    compression.init_app(app)
+    assets.init_app(app)
+    
     # 注册蓝图
     from app.routes.auth import auth_bp
     from app.routes.task import task_bp
     from app.routes.category import category_bp
+    from app.routes.events import events_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(task_bp)
     app.register_blueprint(category_bp)
+    app.register_blueprint(events_bp)
     
-    # 创建数据库表
-    with app.app_context():
-        db.create_all()
+    # 数据库结构由 flask init-db 建立，这里只核对结构版本
+    from app import schema
+    schema.check_schema_version(app)
     
     return app
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+校园待办清单系统 - 静态资源构建
+
+flask build-assets 将 static 下的 CSS/JS 压缩（去注释与多余空白）后按内容
+哈希命名写入 static/dist，并生成 manifest.json（原文件名 -> 哈希文件名）。
+应用启动时读取清单，url_for('static', filename=...) 自动改写为哈希文件名；
+哈希文件内容永不改变，响应带一年有效期的 immutable Cache-Control，
+重复访问页面时浏览器不再请求这些资源。
+
+未构建（没有清单）时照常使用原文件，源文件比清单新的条目也不使用，
+不影响开发调试。内置压缩只做不改变语义的保守处理，安装了 rjsmin/rcssmin
+时优先使用它们。内置的 JS 压缩无法区分正则字面量与除号、也不支持嵌套的
+模板字符串，遇到这类写法时构建失败（UnsupportedSyntaxError），而不是输出
+可能有误、又被长期缓存的文件。
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from flask import request
+from app.compression import precompress_static
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - 可选依赖
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - 可选依赖
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# 第 1 组为字符串字面量（原样保留），第 2 组为注释（删除）
+_JS_TOKENS = re.compile(
+    r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`)|(/\*.*?\*/|//[^\n]*)', re.S
+)
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+
+
+class UnsupportedSyntaxError(ValueError):
+    """内置压缩无法安全处理的源码"""
+
+
+# 两侧空白可以删除的符号（JS 不含 + - /，避免 a + ++b、正则与除号的歧义）
+_JS_PUNCTUATION = re.compile(r'[ \t]*([{}()\[\];,:=<>!&|?*%])[ \t]*')
+# 换行前后为这些符号时可以删除换行，不影响自动分号插入（} 之后的换行保留：var a = {}\nf()）
+_JS_NEWLINE = re.compile(r'(?<=[{(\[;,:])\n|\n(?=[})\],;:?])')
+# CSS 不含 ( 与 +：@media and (...)、calc(a + b) 需要保留空格；冒号只删右侧空白（a :hover 不同于 a:hover）
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def _minify(source, tokens, minify_code):
+    """对字符串字面量以外的代码调用 minify_code，删除注释"""
+    parts, code = [], []
+    position = 0
+    for match in tokens.finditer(source):
+        code.append(source[position:match.start()])
+        position = match.end()
+        if match.group(2) is not None:
+            # 注释视为空白；跨行注释保留换行（JS 自动分号插入依赖换行）
+            code.append('\n' if '\n' in match.group(2) else ' ')
+            continue
+        parts.append(minify_code(''.join(code)))
+        parts.append(match.group(1))
+        code = []
+    code.append(source[position:])
+    parts.append(minify_code(''.join(code)))
+    return ''.join(parts).strip()
+
+
+def _minify_js_code(code):
+    code = re.sub(r'\s*\n\s*', '\n', code)
+    code = re.sub(r'[ \t]+', ' ', code)
+    code = _JS_PUNCTUATION.sub(r'\1', code)
+    return _JS_NEWLINE.sub('', code)
+
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = _CSS_PUNCTUATION.sub(r'\1', code)
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(';}', '}')
+
+
+def _has_open_substitution(template):
+    """模板字符串中是否有未闭合的 ${...}（嵌套模板字符串被提前截断时出现）"""
+    pos = template.find('${')
+    while pos != -1:
+        depth = 0
+        for end in range(pos + 1, len(template)):
+            if template[end] == '{':
+                depth += 1
+            elif template[end] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            return True
+        pos = template.find('${', end)
+    return False
+
+
+def _line_of(source, offset):
+    return source.count('\n', 0, offset) + 1
+
+
+def check_js_syntax(source):
+    """检查源码是否只含内置压缩能处理的写法，否则抛出 UnsupportedSyntaxError"""
+    def check_code(start, end):
+        # 注释与字符串之外的 /：可能是正则字面量，也可能是除号
+        slash = source.find('/', start, end)
+        if slash != -1:
+            raise UnsupportedSyntaxError(f'第 {_line_of(source, slash)} 行：无法区分正则字面量与除号')
+
+    position = 0
+    for match in _JS_TOKENS.finditer(source):
+        check_code(position, match.start())
+        literal = match.group(1)
+        if literal and literal.startswith('`') and _has_open_substitution(literal):
+            raise UnsupportedSyntaxError(f'第 {_line_of(source, match.start())} 行：不支持嵌套的模板字符串')
+        position = match.end()
+    check_code(position, len(source))
+
+
+def minify_js(source):
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    check_js_syntax(source)
+    return _minify(source, _JS_TOKENS, _minify_js_code)
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    return _minify(source, _CSS_TOKENS, _minify_css_code)
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+def hashed_name(filename, content, length=12):
+    """在扩展名前插入内容哈希：js/main.js -> js/main.3f2a9c1d0b7e.js"""
+    digest = hashlib.sha256(content).hexdigest()[:length]
+    base, ext = os.path.splitext(filename)
+    return f'{base}.{digest}{ext}'
+
+
+def build_assets(static_folder, config):
+    """压缩并按内容哈希命名输出 static 下的 CSS/JS，写入清单并预压缩，返回清单"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != dist]
+        for name in sorted(files):
+            minify = MINIFIERS.get(os.path.splitext(name)[1])
+            if minify is None:
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            try:
+                content = minify(source).encode('utf-8')
+            except UnsupportedSyntaxError as e:
+                raise UnsupportedSyntaxError(f'{filename} {e}，请安装 rjsmin/rcssmin 后重新构建') from None
+            target = f'{DIST_DIR}/{hashed_name(filename, content)}'
+            target_path = os.path.join(static_folder, *target.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(content)
+            manifest[filename] = target
+
+    # 清单最后写入：其修改时间用于判断源文件是否在构建后又被修改
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    precompress_static(dist, config)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """读取清单，跳过目标文件缺失或源文件比清单新的条目"""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    built_at = os.path.getmtime(path)
+    result = {}
+    for filename, target in manifest.items():
+        source = os.path.join(static_folder, *filename.split('/'))
+        if not os.path.isfile(os.path.join(static_folder, *target.split('/'))):
+            continue
+        if os.path.isfile(source) and os.path.getmtime(source) > built_at:
+            logger.warning('静态资源 %s 在构建后被修改，请重新执行 flask build-assets', filename)
+            continue
+        result[filename] = target
+    return result
+
+
+def init_app(app):
+    """读取静态资源清单，改写 url_for 生成的地址并为哈希文件设置长期缓存"""
+    manifest = load_manifest(app.static_folder) if (
+        app.config.get('ASSETS_USE_MANIFEST', True) and app.has_static_folder) else {}
+    app.extensions['asset_manifest'] = manifest
+    if not manifest:
+        return
+    hashed = set(manifest.values())
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    @app.after_request
+    def immutable_cache_headers(response):
+        if (request.endpoint == 'static' and response.status_code in (200, 304)
+                and request.view_args.get('filename') in hashed):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
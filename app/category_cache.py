@@ -0,0 +1,152 @@
+"""
+校园待办清单系统 - 分类缓存
+
+预设分类所有用户共享且极少变化，自定义分类只在用户创建/删除分类时变化，
+两者都缓存为只读的轻量记录（不是 ORM 对象，可安全地跨请求、跨线程共享）。
+分类写入提交后通过 app.changes.data_changed 精确失效；TTL 作为兜底，
+限定多进程部署或绕过 ORM 的写入导致的过期时间。
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from app.changes import data_changed
+from app.models import Category
+
+
+class CategoryRecord(namedtuple('CategoryRecord', 'id name is_preset user_id')):
+    """分类的只读快照"""
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, category):
+        return cls(category.id, category.name, bool(category.is_preset), category.user_id)
+
+    def to_dict(self, task_count=0):
+        """转换为字典，字段与 Category.to_dict() 一致"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'is_preset': self.is_preset,
+            'user_id': self.user_id,
+            'task_count': task_count
+        }
+
+
+class CategoryCache:
+    """预设分类 + 按用户划分的自定义分类缓存，用户层按 LRU 淘汰"""
+
+    def __init__(self, ttl=300, max_users=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._clock = clock
+        self._presets = None
+        self._users = OrderedDict()
+        # 构建期间发生的失效会使本次构建结果作废（同 suggest.SuggestionIndex）
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry):
+        return entry is not None and self._clock() - entry[1] < self.ttl
+
+    def get_presets(self):
+        """预设分类记录（元组）"""
+        with self._lock:
+            if self._fresh(self._presets):
+                self.hits += 1
+                return self._presets[0]
+            self.misses += 1
+            generation = self._generation
+
+        categories = Category.query.filter_by(is_preset=True).order_by(Category.id).all()
+        records = tuple(CategoryRecord.from_model(category) for category in categories)
+
+        with self._lock:
+            if generation == self._generation:
+                self._presets = (records, self._clock())
+        return records
+
+    def get_user_categories(self, user_id):
+        """用户自定义分类记录（元组）"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if self._fresh(entry):
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+
+        categories = Category.query.filter_by(user_id=user_id).order_by(Category.id).all()
+        records = tuple(CategoryRecord.from_model(category) for category in categories)
+
+        with self._lock:
+            if generation == self._generation:
+                self._users[user_id] = (records, self._clock())
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return records
+
+    def get_categories(self, user_id):
+        """用户可用的全部分类：预设分类在前"""
+        return self.get_presets() + self.get_user_categories(user_id)
+
+    def invalidate_presets(self):
+        with self._lock:
+            self._presets = None
+            self._generation += 1
+
+    def invalidate_user(self, user_id=None):
+        """失效某个用户的自定义分类；user_id 为 None 时清空用户层"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+            self._generation += 1
+
+    def clear(self):
+        self.invalidate_presets()
+        self.invalidate_user()
+
+    def on_data_changed(self, sender, changes):
+        """data_changed 信号接收函数：只关心分类变更"""
+        for change in changes:
+            if change.entity != 'category':
+                continue
+            if change.user_id is None:
+                self.invalidate_presets()
+            else:
+                self.invalidate_user(change.user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'presets_cached': self._presets is not None,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def init_app(app):
+    """为应用创建分类缓存并订阅数据变更"""
+    cache = CategoryCache(
+        ttl=app.config.get('CATEGORY_CACHE_TTL', 300),
+        max_users=app.config.get('CATEGORY_CACHE_MAX_USERS', 10000)
+    )
+    app.extensions['category_cache'] = cache
+    data_changed.connect(cache.on_data_changed, sender=app)
+
+
+def get_category_cache():
+    """当前应用的分类缓存"""
+    return current_app.extensions['category_cache']
+
+
+def get_categories(user_id):
+    """用户可用的分类列表（只读记录）"""
+    return list(get_category_cache().get_categories(user_id))
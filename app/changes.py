@@ -0,0 +1,74 @@
+"""
+校园待办清单系统 - 数据变更通知
+
+会话 flush 时记录用户/任务/分类的增删改，事务提交后通过 data_changed 信号
+统一广播（回滚则丢弃）。搜索建议、缓存等进程内组件订阅该信号，路由中
+无需逐个调用。绕过 ORM 的批量语句需自行调用 record_change()。
+"""
+from collections import namedtuple
+from blinker import Namespace
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import User, Task, Category
+
+# entity: 'user' / 'task' / 'category'；op: 'create' / 'update' / 'delete'
+# user_id: 数据所属用户（用户本身的变更即为其 id）
+# data: 变更相关字段，任务为 {'title': 新标题, 'old_title': 原标题}
+Change = namedtuple('Change', 'entity op user_id id data')
+
+_signals = Namespace()
+
+# 事务提交后发送，sender 为当前应用，参数 changes 为 Change 列表
+data_changed = _signals.signal('data-changed')
+
+PENDING_KEY = 'pending_changes'
+
+TRACKED_MODELS = {User: 'user', Task: 'task', Category: 'category'}
+
+
+def record_change(session, entity, op, user_id, obj_id=None, data=None):
+    """记录一条待提交的变更"""
+    session.info.setdefault(PENDING_KEY, []).append(
+        Change(entity, op, user_id, obj_id, data or {})
+    )
+
+
+def _change_data(obj, op):
+    """提取变更通知中携带的字段"""
+    if isinstance(obj, User):
+        return {'username': obj.username}
+    if not isinstance(obj, Task):
+        return {'name': obj.name}
+    old_title = obj.title
+    if op == 'update':
+        history = inspect(obj).attrs.title.history
+        if history.deleted:
+            old_title = history.deleted[0]
+    return {'title': obj.title, 'old_title': old_title}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    for op, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            entity = TRACKED_MODELS.get(type(obj))
+            if entity is None:
+                continue
+            if op == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            owner_id = obj.id if entity == 'user' else obj.user_id
+            record_change(session, entity, op, owner_id, obj.id, _change_data(obj, op))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        sender = current_app._get_current_object() if has_app_context() else None
+        data_changed.send(sender, changes=changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(PENDING_KEY, None)
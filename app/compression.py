@@ -0,0 +1,171 @@
+"""
+校园待办清单系统 - 响应压缩
+
+按请求的 Accept-Encoding 协商 br（安装了 brotli 时）或 gzip，在 after_request
+中压缩 HTML/JSON/CSV 等文本响应：
+- 普通响应小于 COMPRESS_MIN_SIZE 字节时不压缩；
+- 流式响应（如任务导出）逐块压缩，每块后同步刷新，客户端可以边收边解析；
+- 静态文件不在请求时压缩，由 flask compress-static 预先生成 .br/.gz 文件，
+  请求时直接发送与之匹配的预压缩文件。
+压缩后的响应 ETag 改为弱校验（同一内容的不同编码不是逐字节相同）。
+"""
+import gzip
+import mimetypes
+import os
+import zlib
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+# 预压缩静态文件的扩展名，按优先顺序
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(encodings=None):
+    """根据 Accept-Encoding 选择压缩编码，不接受压缩时返回 None"""
+    accept = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+class StreamCompressor:
+    """逐块压缩，每块结束时刷新输出"""
+
+    def __init__(self, encoding, config):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            # wbits=31：带 gzip 头部
+            self._compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def is_compressible(response, config):
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    return response.mimetype in config['COMPRESS_MIMETYPES']
+
+
+def compress_response(response):
+    """after_request 钩子：按协商结果压缩响应"""
+    config = current_app.config
+    if not config['COMPRESS_ENABLED'] or request.method == 'HEAD' or not is_compressible(response, config):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        if not config['COMPRESS_STREAMS']:
+            return response
+        compressor = StreamCompressor(encoding, config)
+        response.response = compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress(data, encoding, config))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_static(filename):
+    """静态文件视图：存在且不旧于原文件的预压缩版本时优先发送"""
+    app = current_app
+    source = safe_join(app.static_folder, filename)
+    if app.config['COMPRESS_ENABLED'] and source and os.path.isfile(source):
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            compressed = source + suffix
+            if (request.accept_encodings[encoding] > 0 and os.path.isfile(compressed)
+                    and os.path.getmtime(compressed) >= os.path.getmtime(source)):
+                response = send_from_directory(
+                    app.static_folder, filename + suffix,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    max_age=app.get_send_file_max_age(filename)
+                )
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+    return app.send_static_file(filename)
+
+
+def precompress_static(static_folder, config, min_size=None):
+    """为静态目录中的文本文件生成 .gz（及 .br）预压缩文件，返回生成的文件列表"""
+    min_size = config['COMPRESS_MIN_SIZE'] if min_size is None else min_size
+    # 静态文件只压缩一次，使用最高压缩级别
+    level_config = dict(config, COMPRESS_LEVEL=9, COMPRESS_BROTLI_QUALITY=11)
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if name.endswith(tuple(PRECOMPRESSED_SUFFIXES.values())):
+                continue
+            if not name.endswith(tuple(config['COMPRESS_STATIC_EXTENSIONS'])):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            for encoding in available_encodings():
+                target = path + PRECOMPRESSED_SUFFIXES[encoding]
+                with open(target, 'wb') as f:
+                    f.write(compress(data, encoding, level_config))
+                written.append(target)
+    return written
+
+
+def init_app(app):
+    """注册压缩钩子，并让静态文件路由支持预压缩文件"""
+    app.after_request(compress_response)
+    if app.has_static_folder:
+        app.view_functions['static'] = send_static
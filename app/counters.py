@@ -0,0 +1,223 @@
+"""
+校园待办清单系统 - 任务计数表
+
+按 (用户, 分类, 优先级) 维护任务总数和已完成数，统计面板只需读取该用户
+的少量计数行，不再扫描全部任务。会话 flush 时根据任务的增删改累计增量，
+在提交前（与业务写入同一事务）合并写入；绕过 ORM 的批量语句需自行调用
+add_delta()。逾期数随时间变化，不做存储，由截止日期索引的范围计数得到。
+
+ORM 对象的属性是请求开始时读取的，并发修改同一任务时并不可靠：修改/删除
+任务的 flush 之前先以一条空更新锁定这些行并读取当前值，flush 之后（仍持有
+锁）再读取新值，增量按数据库中实际发生的变化计算。
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Task, TaskCounter
+
+DELTAS_KEY = 'task_counter_deltas'
+PURGE_KEY = 'task_counter_purge_users'
+LOCKED_KEY = 'task_counter_locked_rows'
+
+# 影响计数的任务列
+COUNTED_COLUMNS = ('user_id', 'category_id', 'priority', 'is_completed')
+
+
+def counter_key(user_id, category_id, priority):
+    return (user_id, category_id or TaskCounter.NO_CATEGORY, priority or '')
+
+
+def add_delta(session, user_id, category_id, priority, total, completed):
+    """累计一条计数增量，提交前统一写入"""
+    if not total and not completed:
+        return
+    deltas = session.info.setdefault(DELTAS_KEY, {})
+    key = counter_key(user_id, category_id, priority)
+    old_total, old_completed = deltas.get(key, (0, 0))
+    deltas[key] = (old_total + total, old_completed + completed)
+
+
+def add_task(session, user_id, category_id, priority, is_completed, sign=1):
+    """任务新增（sign=1）或删除（sign=-1）对应的计数增量"""
+    add_delta(session, user_id, category_id, priority, sign, sign if is_completed else 0)
+
+
+def _previous(state, name):
+    """属性在本次 flush 前的值"""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def lock_task_rows(connection, task_ids):
+    """以一条空更新锁定任务行（SQLite 写锁或行锁）并返回 {id: 计数列的当前值}"""
+    table = Task.__table__
+    rows = connection.execute(
+        table.update().where(table.c.id.in_(task_ids)).values(id=table.c.id)
+        .returning(table.c.id, *(table.c[name] for name in COUNTED_COLUMNS))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def read_task_rows(connection, task_ids):
+    table = Task.__table__
+    rows = connection.execute(
+        db.select(table.c.id, *(table.c[name] for name in COUNTED_COLUMNS)).where(table.c.id.in_(task_ids))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+@event.listens_for(Session, 'before_flush')
+def _lock_changed_tasks(session, flush_context, instances):
+    task_ids = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, Task) and obj.id is not None and session.is_modified(obj, include_collections=False)
+    ] + [obj.id for obj in session.deleted if isinstance(obj, Task) and obj.id is not None]
+    if task_ids:
+        session.info[LOCKED_KEY] = (set(task_ids), lock_task_rows(session.connection(), task_ids))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_deltas(session, flush_context):
+    # 锁定时已不存在的行（被并发删除）不计增量；未锁定的（如级联删除）退回使用属性历史
+    locked_ids, locked = session.info.pop(LOCKED_KEY, (set(), {}))
+    for obj in session.new:
+        if isinstance(obj, Task):
+            add_task(session, obj.user_id, obj.category_id, obj.priority, obj.is_completed)
+
+    updated = [
+        obj for obj in session.dirty
+        if isinstance(obj, Task) and session.is_modified(obj, include_collections=False)
+    ]
+    current = read_task_rows(session.connection(), [obj.id for obj in updated]) if updated else {}
+    for obj in updated:
+        if obj.id in locked_ids:
+            old, new = locked.get(obj.id), current.get(obj.id)
+        else:
+            state = inspect(obj)
+            old = tuple(_previous(state, name) for name in COUNTED_COLUMNS)
+            new = tuple(getattr(obj, name) for name in COUNTED_COLUMNS)
+        if old is not None and new is not None and old != new:
+            add_task(session, *old, sign=-1)
+            add_task(session, *new)
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            if obj.id in locked_ids:
+                if obj.id in locked:
+                    add_task(session, *locked[obj.id], sign=-1)
+            else:
+                state = inspect(obj)
+                add_task(session, *(_previous(state, name) for name in COUNTED_COLUMNS), sign=-1)
+        elif isinstance(obj, User):
+            session.info.setdefault(PURGE_KEY, set()).add(obj.id)
+
+
+# 各数据库的 INSERT ... ON CONFLICT / ON DUPLICATE KEY 语句构造函数
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert, 'mysql': mysql.insert}
+
+
+def upsert_statement(dialect_name, table, increments):
+    """插入计数行，主键冲突时把 increments 中的列累加到已有行"""
+    insert = UPSERT_INSERTS.get(dialect_name)
+    if insert is None:
+        raise NotImplementedError(f'任务计数表不支持数据库 {dialect_name}')
+    statement = insert(table)
+    if dialect_name == 'mysql':
+        return statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in increments}
+        )
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={name: table.c[name] + statement.excluded[name] for name in increments}
+    )
+
+
+def apply_deltas(session, deltas):
+    """将累计的增量合并写入计数表，并清理计数归零的行"""
+    table = TaskCounter.__table__
+    rows = [
+        {'user_id': user_id, 'category_id': category_id, 'priority': priority,
+         'total': total, 'completed': completed}
+        for (user_id, category_id, priority), (total, completed) in sorted(deltas.items())
+        if total or completed
+    ]
+    if not rows:
+        return
+    statement = upsert_statement(session.get_bind().dialect.name, table, ('total', 'completed'))
+    session.execute(statement, rows)
+    user_ids = {row['user_id'] for row in rows}
+    session.execute(table.delete().where(table.c.user_id.in_(user_ids), table.c.total <= 0))
+
+
+@event.listens_for(Session, 'before_commit')
+def _apply_on_commit(session):
+    session.flush()
+    deltas = session.info.pop(DELTAS_KEY, None)
+    if deltas:
+        apply_deltas(session, deltas)
+    purge = session.info.pop(PURGE_KEY, None)
+    if purge:
+        table = TaskCounter.__table__
+        session.execute(table.delete().where(table.c.user_id.in_(purge)))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_deltas(session):
+    session.info.pop(DELTAS_KEY, None)
+    session.info.pop(PURGE_KEY, None)
+
+
+def move_category(session, category_id):
+    """分类删除、其任务改为未分类时，把该分类的计数并入未分类"""
+    rows = session.execute(
+        db.select(TaskCounter.user_id, TaskCounter.priority, TaskCounter.total, TaskCounter.completed)
+        .where(TaskCounter.category_id == category_id)
+    ).all()
+    for user_id, priority, total, completed in rows:
+        add_delta(session, user_id, category_id, priority, -total, -completed)
+        add_delta(session, user_id, None, priority, total, completed)
+
+
+def get_counters(user_id):
+    """用户的计数行 [(分类ID或None, 优先级, 总数, 已完成数)]"""
+    rows = db.session.execute(
+        db.select(TaskCounter.category_id, TaskCounter.priority, TaskCounter.total, TaskCounter.completed)
+        .where(TaskCounter.user_id == user_id)
+    ).all()
+    return [
+        (None if category_id == TaskCounter.NO_CATEGORY else category_id, priority or None, total, completed)
+        for category_id, priority, total, completed in rows
+    ]
+
+
+def count_overdue(user_id, now):
+    """逾期任务数：在 (user_id, is_completed, deadline) 索引上做范围计数"""
+    return db.session.query(db.func.count(Task.id)).filter(
+        Task.user_id == user_id,
+        Task.is_completed == False,
+        Task.deadline < now
+    ).scalar()
+
+
+def rebuild_counters(user_id=None):
+    """根据 tasks 表重建计数（对账），user_id 为 None 时重建全部用户"""
+    table = TaskCounter.__table__
+    category = db.func.coalesce(Task.category_id, TaskCounter.NO_CATEGORY)
+    priority = db.func.coalesce(Task.priority, '')
+    completed = db.func.sum(db.case((Task.is_completed == True, 1), else_=0))
+    select = db.select(
+        Task.user_id, category, priority, db.func.count(Task.id), completed
+    ).group_by(Task.user_id, category, priority)
+    delete = table.delete()
+    if user_id is not None:
+        select = select.where(Task.user_id == user_id)
+        delete = delete.where(table.c.user_id == user_id)
+
+    db.session.execute(delete)
+    db.session.execute(table.insert().from_select(
+        ['user_id', 'category_id', 'priority', 'total', 'completed'], select
+    ))
+    db.session.commit()
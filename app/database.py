@@ -0,0 +1,65 @@
+"""
+校园待办清单系统 - 数据库引擎配置
+
+SQLite 默认使用回滚日志，写事务会阻塞所有读请求，并发切换任务状态时
+容易出现 "database is locked"。这里在每个新建连接上应用 SQLITE_PRAGMAS
+（WAL、synchronous=NORMAL、busy_timeout 等），并为文件数据库显式配置
+连接池参数。内存数据库（测试）使用 Flask-SQLAlchemy 默认的 StaticPool。
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from app import db
+
+# 只允许这些 PRAGMA 名称，参数值来自配置，仍做一次类型检查
+ALLOWED_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size',
+                   'cache_size', 'temp_store', 'foreign_keys', 'wal_autocheckpoint')
+
+
+def is_file_sqlite(uri):
+    """是否为 SQLite 文件数据库"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def apply_engine_options(app):
+    """根据配置生成连接池参数，需在 db.init_app() 之前调用"""
+    if not is_file_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('pool_size', app.config.get('DB_POOL_SIZE', 10))
+    options.setdefault('max_overflow', app.config.get('DB_MAX_OVERFLOW', 10))
+    options.setdefault('pool_timeout', app.config.get('DB_POOL_TIMEOUT', 10))
+    options.setdefault('pool_pre_ping', False)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def pragma_statements(pragmas):
+    """将 PRAGMA 配置转换为语句列表"""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ValueError(f'不支持的 SQLite PRAGMA: {name}')
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise ValueError(f'无效的 PRAGMA 参数: {name}={value!r}')
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+def init_app(app):
+    """在应用的 SQLite 引擎上注册连接参数，需在 db.init_app() 之后调用"""
+    statements = pragma_statements(app.config.get('SQLITE_PRAGMAS', {}))
+    if not statements:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,62 @@
+"""
+校园待办清单系统 - 截止日期区间
+
+今日/逾期/即将到期筛选统一按 UTC 计算（与 Task.is_today、is_overdue
+一致），换算成半开区间 [start, end) 直接比较 deadline 列，索引可以完成
+范围扫描，不再对列套用 date() 函数。按天汇总的查询使用写入时维护的
+deadline_day 列。
+"""
+from datetime import datetime, time, timedelta
+from app import db
+from app.models import Task
+
+DEADLINE_FILTERS = ('today', 'overdue', 'upcoming')
+
+
+def utc_today():
+    return datetime.utcnow().date()
+
+
+def day_range(day, days=1):
+    """从 day 零点开始、长度为 days 天的半开区间 (start, end)"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=days)
+
+
+def deadline_conditions(filter_type, now=None, upcoming_days=7):
+    """返回截止日期筛选条件列表（均为未完成任务）"""
+    now = now or datetime.utcnow()
+    if filter_type == 'today':
+        start, end = day_range(now.date())
+        window = (Task.deadline >= start, Task.deadline < end)
+    elif filter_type == 'overdue':
+        window = (Task.deadline < now,)
+    elif filter_type == 'upcoming':
+        window = (Task.deadline >= now, Task.deadline < now + timedelta(days=upcoming_days))
+    else:
+        raise ValueError(f'未知的截止日期筛选: {filter_type}')
+    return [Task.is_completed == False, *window]
+
+
+def due_counts_by_day(user_id, start_day, days):
+    """统计 [start_day, start_day + days) 内每天到期的任务数
+
+    返回 [{'day', 'total', 'pending'}]，没有任务的日期计数为 0。
+    """
+    end_day = start_day + timedelta(days=days)
+    pending = db.case((Task.is_completed == False, 1), else_=0)
+    rows = db.session.query(
+        Task.deadline_day, db.func.count(Task.id), db.func.sum(pending)
+    ).filter(
+        Task.user_id == user_id,
+        Task.deadline_day >= start_day,
+        Task.deadline_day < end_day
+    ).group_by(Task.deadline_day).all()
+
+    counts = {day: (total, pending or 0) for day, total, pending in rows}
+    result = []
+    for offset in range(days):
+        day = start_day + timedelta(days=offset)
+        total, pending = counts.get(day, (0, 0))
+        result.append({'day': day.isoformat(), 'total': total, 'pending': pending})
+    return result
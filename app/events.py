@@ -0,0 +1,155 @@
+"""
+校园待办清单系统 - 变更事件推送（进程内发布/订阅）
+
+任务/分类的写入提交后，app.changes.data_changed 信号把变更交给 EventHub，
+由它分发给该用户的每个 SSE 连接（/api/events）。每个连接一个有界队列：
+发布方从不阻塞，队列已满说明客户端读取过慢，直接断开该连接，客户端重连
+后通过 /api/tasks/changes 补齐期间的变更。
+事件只在产生写入的进程内分发，多进程部署时需改用外部消息通道。
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from flask import current_app, has_request_context, request
+from app.changes import data_changed
+
+# 推送给客户端的实体类型
+EVENT_ENTITIES = ('task', 'category')
+
+# 客户端在写请求中携带该请求头，推送的事件中原样带回，用于忽略自己触发的事件
+CLIENT_ID_HEADER = 'X-Client-Id'
+
+
+class SubscriberClosed(Exception):
+    """订阅已被关闭（读取过慢、被新连接替换或服务关闭）"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Subscriber:
+    """一个 SSE 连接的事件队列"""
+
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self.closed = None
+        self._events = deque()
+        self._condition = threading.Condition()
+
+    def offer(self, event):
+        """非阻塞入队，队列已满时返回 False"""
+        with self._condition:
+            if self.closed:
+                return True
+            if len(self._events) >= self.max_queue:
+                return False
+            self._events.append(event)
+            self._condition.notify()
+            return True
+
+    def get(self, timeout):
+        """取出下一个事件，超时返回 None，已关闭时抛出 SubscriberClosed"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._events or self.closed, timeout)
+            if self.closed:
+                raise SubscriberClosed(self.closed)
+            return self._events.popleft() if self._events else None
+
+    def close(self, reason):
+        with self._condition:
+            self.closed = reason
+            self._events.clear()
+            self._condition.notify_all()
+
+
+class EventHub:
+    """按用户分发变更事件"""
+
+    def __init__(self, queue_size=100, max_subscribers_per_user=5):
+        self.queue_size = queue_size
+        self.max_subscribers_per_user = max_subscribers_per_user
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        subscriber = Subscriber(user_id, self.queue_size)
+        with self._lock:
+            subscribers = self._subscribers.setdefault(user_id, [])
+            subscribers.append(subscriber)
+            # 同一用户连接过多（如大量标签页）时关闭最早的连接
+            while len(subscribers) > self.max_subscribers_per_user:
+                subscribers.pop(0).close('replaced')
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(subscriber.user_id, None)
+
+    def publish(self, user_id, event):
+        """向用户的所有连接投递事件；user_id 为 None 时投递给所有连接"""
+        event = dict(event, id=next(self._ids))
+        with self._lock:
+            if user_id is None:
+                targets = [s for subscribers in self._subscribers.values() for s in subscribers]
+            else:
+                targets = list(self._subscribers.get(user_id, ()))
+        slow = [subscriber for subscriber in targets if not subscriber.offer(event)]
+        for subscriber in slow:
+            subscriber.close('slow')
+            self.unsubscribe(subscriber)
+        with self._lock:
+            self.published += 1
+            self.dropped += len(slow)
+
+    def on_data_changed(self, sender, changes):
+        """data_changed 信号接收函数：每个用户一条事件，包含本次提交的全部变更"""
+        origin = request.headers.get(CLIENT_ID_HEADER) if has_request_context() else None
+        by_user = {}
+        for change in changes:
+            if change.entity in EVENT_ENTITIES:
+                by_user.setdefault(change.user_id, []).append({
+                    'entity': change.entity, 'op': change.op, 'id': change.id, 'data': change.data
+                })
+        for user_id, items in by_user.items():
+            self.publish(user_id, {'changes': items, 'origin': origin, 'time': time.time()})
+
+    def close_all(self, reason='shutdown'):
+        with self._lock:
+            subscribers = [s for items in self._subscribers.values() for s in items]
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close(reason)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'subscribers': sum(len(items) for items in self._subscribers.values()),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+
+def init_app(app):
+    """为应用创建事件分发器并订阅数据变更"""
+    hub = EventHub(
+        queue_size=app.config.get('EVENTS_QUEUE_SIZE', 100),
+        max_subscribers_per_user=app.config.get('EVENTS_MAX_SUBSCRIBERS_PER_USER', 5)
+    )
+    app.extensions['event_hub'] = hub
+    data_changed.connect(hub.on_data_changed, sender=app)
+
+
+def get_event_hub():
+    """当前应用的事件分发器"""
+    return current_app.extensions['event_hub']
@@ -0,0 +1,62 @@
+"""
+校园待办清单系统 - JSON 序列化
+
+安装了 orjson 时用它替换 Flask 默认的 json 模块完成 jsonify()/request.json
+的编解码，未安装时退回 Flask 默认实现，输出的 JSON 内容一致（键排序、
+datetime 等特殊类型的转换规则不变），只是中文不再转义为 \\uXXXX。
+通过配置 JSON_PROVIDER 选择：'auto'（默认，有 orjson 则用）或 'default'。
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+# orjson 能处理的 dumps 参数，出现其他参数时交给标准库
+ORJSON_DUMPS_ARGS = {'default', 'sort_keys', 'ensure_ascii', 'indent', 'separators'}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """基于 orjson 的 JSON 提供者"""
+
+    def _dumps_bytes(self, obj, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        # datetime 交给 default()，与标准库实现的格式保持一致
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - ORJSON_DUMPS_ARGS or kwargs.get('default', self.default) is not self.default:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._dumps_bytes(obj, kwargs.get('indent'), kwargs.get('sort_keys')).decode()
+        except TypeError:
+            # 超出 64 位的整数等 orjson 不支持的值
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = self._dumps_bytes(obj, indent)
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """按配置为应用选择 JSON 提供者"""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice not in ('auto', 'default'):
+        raise ValueError(f'未知的 JSON_PROVIDER: {choice}')
+    if choice == 'auto' and orjson is not None:
+        app.json = FastJSONProvider(app)
@@ -2,9 +2,10 @@
 校园待办清单系统 - 数据模型
 """
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.orm import defer, with_expression
 from app import db, login_manager
+from app.passwords import get_password_hasher
 
 class User(UserMixin, db.Model):
     """用户模型"""
@@ -13,7 +14,8 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False, index=True)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    # scrypt 哈希约 162 个字符，留出更换哈希方法与加长盐的余量
+    password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 关系
@@ -21,12 +23,22 @@ class User(UserMixin, db.Model):
     categories = db.relationship('Category', backref='owner', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """设置密码（加密存储）"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（加密存储，哈希在进程池中计算）"""
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
         """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+    
+    def rehash_password(self, password):
+        """哈希参数变更后按新参数重新加密，返回是否更新了密码哈希
+
+        只应在 check_password() 验证通过后调用。
+        """
+        if not get_password_hasher().needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
     
     def to_dict(self):
         """转换为字典"""
@@ -54,14 +66,30 @@ class Category(db.Model):
     # 关系
     tasks = db.relationship('Task', backref='category', lazy='dynamic')
     
-    def to_dict(self):
-        """转换为字典"""
+    @staticmethod
+    def task_counts(user_id):
+        """一次 GROUP BY 查询获取某用户在各分类下的任务数 {category_id: count}"""
+        rows = db.session.query(
+            Task.category_id, db.func.count(Task.id)
+        ).filter(
+            Task.user_id == user_id,
+            Task.category_id.isnot(None)
+        ).group_by(Task.category_id).all()
+        return dict(rows)
+    
+    def to_dict(self, task_count=None):
+        """转换为字典
+
+        批量序列化时应传入 Category.task_counts() 的结果，避免逐个分类计数。
+        """
+        if task_count is None:
+            task_count = self.tasks.count()
         return {
             'id': self.id,
             'name': self.name,
             'is_preset': self.is_preset,
             'user_id': self.user_id,
-            'task_count': self.tasks.count()
+            'task_count': task_count
         }
     
     def __repr__(self):
@@ -87,11 +115,20 @@ class Task(db.Model):
     
     PRIORITY_LABELS = dict(PRIORITY_CHOICES)
     
+    # 优先级排序权重（越小越靠前），随 priority 写入 priority_rank 列
+    PRIORITY_RANKS = {value: rank for rank, (value, _) in enumerate(PRIORITY_CHOICES, start=1)}
+    # 升级前已存在的未知优先级排在最后
+    UNKNOWN_PRIORITY_RANK = len(PRIORITY_CHOICES) + 1
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(50), nullable=False)
     description = db.Column(db.Text, nullable=True)
     deadline = db.Column(db.DateTime, nullable=True)
+    # 截止日期所在的日期（UTC），随 deadline 写入维护，用于按天汇总
+    deadline_day = db.Column(db.Date, nullable=True)
     priority = db.Column(db.String(30), default=PRIORITY_IMPORTANT_NOT_URGENT)
+    priority_rank = db.Column(db.SmallInteger, nullable=False,
+                              default=PRIORITY_RANKS[PRIORITY_IMPORTANT_NOT_URGENT])
     is_completed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -100,6 +137,45 @@ class Task(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
     
+    # 列表页显示的描述摘要，由查询通过 description_preview_options() 填充
+    DESCRIPTION_PREVIEW_LENGTH = 100
+    description_preview = db.query_expression()
+    
+    # 复合索引：与任务列表的筛选/排序组合一一对应
+    __table_args__ = (
+        # 状态筛选（今日/逾期/待完成/已完成）+ 按截止日期排序
+        db.Index('ix_tasks_user_completed_deadline', 'user_id', 'is_completed', 'deadline'),
+        # 状态筛选 + 默认按创建时间倒序
+        db.Index('ix_tasks_user_completed_created', 'user_id', 'is_completed', 'created_at'),
+        # 全部任务按创建时间倒序
+        db.Index('ix_tasks_user_created', 'user_id', 'created_at'),
+        # 按分类筛选（同时覆盖默认排序）
+        db.Index('ix_tasks_user_category', 'user_id', 'category_id', 'created_at'),
+        # 按优先级排序（id 为游标分页的次级排序键）
+        db.Index('ix_tasks_user_priority', 'user_id', 'priority_rank', 'id'),
+        # 按天汇总到期任务（覆盖完成状态，无需回表）
+        db.Index('ix_tasks_user_deadline_day', 'user_id', 'deadline_day', 'is_completed'),
+        # 增量同步：按修改时间（及隐含的 rowid）顺序读取变更
+        db.Index('ix_tasks_user_updated', 'user_id', 'updated_at'),
+    )
+    
+    @staticmethod
+    def deadline_day_of(deadline):
+        """deadline 对应的 deadline_day 值"""
+        return deadline.date() if deadline else None
+    
+    @db.validates('deadline')
+    def _sync_deadline_day(self, key, deadline):
+        self.deadline_day = self.deadline_day_of(deadline)
+        return deadline
+    
+    @db.validates('priority')
+    def _sync_priority_rank(self, key, priority):
+        if priority not in self.PRIORITY_RANKS:
+            raise ValueError(f'未知的优先级: {priority}')
+        self.priority_rank = self.PRIORITY_RANKS[priority]
+        return priority
+    
     @property
     def priority_label(self):
         """获取优先级中文标签"""
@@ -120,29 +196,157 @@ class Task(db.Model):
             return self.deadline.date() == today
         return False
     
-    def to_dict(self):
-        """转换为字典"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'deadline': self.deadline.isoformat() if self.deadline else None,
-            'priority': self.priority,
-            'priority_label': self.priority_label,
-            'is_completed': self.is_completed,
-            'is_overdue': self.is_overdue,
-            'is_today': self.is_today,
-            'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    @classmethod
+    def description_preview_options(cls):
+        """延迟加载完整描述，在 SQL 中截取摘要（多取一个字符用于判断是否被截断）"""
+        preview = db.func.substr(cls.description, 1, cls.DESCRIPTION_PREVIEW_LENGTH + 1)
+        return [defer(cls.description), with_expression(cls.description_preview, preview)]
+    
+    def to_dict(self, now=None):
+        """转换为字典（多个任务请使用 Task.to_dicts()）"""
+        return Task.to_dicts((self,), now)[0]
+    
+    @classmethod
+    def to_dicts(cls, tasks, now=None, fields=None):
+        """批量转换为字典，字段与 to_dict() 一致
+        
+        整批只读取一次当前时间计算 is_overdue/is_today，并省去逐条访问属性的开销。
+        fields 为 SERIALIZED_FIELDS 的子集时只输出这些字段，且只访问其依赖的列，
+        可与 load_only(*Task.columns_for_fields(fields)) 配合使用。
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+        if fields is not None:
+            getters = [(name, FIELD_GETTERS[name]) for name in fields]
+            return [{name: get(task, now, today) for name, get in getters} for task in tasks]
+        
+        labels = cls.PRIORITY_LABELS
+        result = []
+        append = result.append
+        for task in tasks:
+            deadline = task.deadline
+            created_at = task.created_at
+            updated_at = task.updated_at
+            category = task.category
+            append({
+                'id': task.id,
+                'title': task.title,
+                'description': task.description,
+                'deadline': deadline.isoformat() if deadline else None,
+                'priority': task.priority,
+                'priority_label': labels.get(task.priority, '未知'),
+                'is_completed': task.is_completed,
+                'is_overdue': bool(deadline and not task.is_completed and now > deadline),
+                'is_today': bool(deadline and deadline.date() == today),
+                'category_id': task.category_id,
+                'category_name': category.name if category else None,
+                'created_at': created_at.isoformat() if created_at else None,
+                'updated_at': updated_at.isoformat() if updated_at else None
+            })
+        return result
+    
+    # 可序列化字段及其依赖的列（?fields= 稀疏字段集）
+    SERIALIZED_FIELDS = {
+        'id': ('id',),
+        'title': ('title',),
+        'description': ('description',),
+        'deadline': ('deadline',),
+        'priority': ('priority',),
+        'priority_label': ('priority',),
+        'is_completed': ('is_completed',),
+        'is_overdue': ('deadline', 'is_completed'),
+        'is_today': ('deadline',),
+        'category_id': ('category_id',),
+        'category_name': ('category_id',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    
+    @classmethod
+    def columns_for_fields(cls, fields):
+        """字段子集依赖的列属性（含主键）"""
+        names = {'id'}
+        for name in fields:
+            names.update(cls.SERIALIZED_FIELDS[name])
+        return [getattr(cls, name) for name in sorted(names)]
     
     def __repr__(self):
         return f'<Task {self.title}>'
 
 
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# 稀疏字段集的逐字段取值函数 (task, now, today)，与 Task.to_dicts() 的完整输出一致
+FIELD_GETTERS = {
+    'id': lambda task, now, today: task.id,
+    'title': lambda task, now, today: task.title,
+    'description': lambda task, now, today: task.description,
+    'deadline': lambda task, now, today: _isoformat(task.deadline),
+    'priority': lambda task, now, today: task.priority,
+    'priority_label': lambda task, now, today: Task.PRIORITY_LABELS.get(task.priority, '未知'),
+    'is_completed': lambda task, now, today: task.is_completed,
+    'is_overdue': lambda task, now, today: bool(
+        task.deadline and not task.is_completed and now > task.deadline),
+    'is_today': lambda task, now, today: bool(task.deadline and task.deadline.date() == today),
+    'category_id': lambda task, now, today: task.category_id,
+    'category_name': lambda task, now, today: task.category.name if task.category else None,
+    'created_at': lambda task, now, today: _isoformat(task.created_at),
+    'updated_at': lambda task, now, today: _isoformat(task.updated_at),
+}
+
+
+class UserDataVersion(db.Model):
+    """用户数据版本：该用户的任务/分类每次写入都会递增，用于生成 ETag"""
+    __tablename__ = 'user_data_versions'
+    
+    # 不设外键：GLOBAL_USER_ID 行记录预设分类等所有用户共享的数据
+    GLOBAL_USER_ID = 0
+    
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserDataVersion {self.user_id}:{self.version}>'
+
+
+class TaskCounter(db.Model):
+    """任务计数：按 (用户, 分类, 优先级) 维护的任务总数和已完成数，由 app.counters 维护"""
+    __tablename__ = 'task_counters'
+    
+    # 未分类任务的分类键（主键列不能为空）
+    NO_CATEGORY = 0
+    
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    priority = db.Column(db.String(30), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TaskCounter {self.user_id}:{self.category_id}:{self.priority}>'
+
+
+class TaskTombstone(db.Model):
+    """已删除任务的墓碑记录，供增量同步接口返回删除；超过保留期后由 app.sync 清理"""
+    __tablename__ = 'task_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_task_tombstones_user_deleted', 'user_id', 'deleted_at'),
+    )
+    
+    def __repr__(self):
+        return f'<TaskTombstone {self.user_id}:{self.task_id}>'
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Flask-Login 用户加载回调"""
-    return User.query.get(int(user_id))
\ No newline at end of file
+    """Flask-Login 用户加载回调：经由进程内缓存返回只读的用户快照"""
+    from app.user_cache import get_user_cache
+    return get_user_cache().get(int(user_id))
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+校园待办清单系统 - 页面缓存
+
+任务列表页面的大部分访问是同一用户以相同筛选条件刷新。这里按
+(用户, 数据版本 ETag, 查询参数) 缓存渲染后的 HTML：数据版本随写入递增，
+旧版本的页面不会再被命中；写入提交后同时通过 app.changes.data_changed
+立即移除该用户的缓存页面以释放内存。缓存总字节数超出上限时按最近最少
+使用淘汰。有待显示的闪现消息时不读也不写缓存。
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from app.changes import data_changed
+from app.versioning import data_etag
+
+# 每个缓存条目除页面内容外的估算开销（字节）
+ENTRY_OVERHEAD = 256
+
+
+class PageCache:
+    """渲染结果的 LRU 缓存，以字节数为容量上限"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(body):
+        return len(body) + ENTRY_OVERHEAD
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body):
+        size = self._size(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[key] = body
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        """移除某个用户的缓存页面；user_id 为 None 时清空"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [key for key in self._entries if key[0] == user_id]:
+                self._bytes -= self._size(self._entries.pop(key))
+
+    def on_data_changed(self, sender, changes):
+        """data_changed 信号接收函数：任务/分类写入使对应用户的页面失效"""
+        user_ids = {change.user_id for change in changes if change.entity in ('task', 'category')}
+        if None in user_ids:
+            # 预设分类等共享数据变化影响所有用户
+            self.invalidate()
+            return
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+
+def init_app(app):
+    """为应用创建页面缓存并订阅数据变更"""
+    cache = PageCache(max_bytes=app.config.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.extensions['page_cache'] = cache
+    data_changed.connect(cache.on_data_changed, sender=app)
+
+
+def get_page_cache():
+    """当前应用的页面缓存"""
+    return current_app.extensions['page_cache']
+
+
+def cache_page(view):
+    """缓存页面视图的完整渲染结果（放在 @login_required 之后）
+
+    分页游标请求（“加载更多”片段）与有待显示闪现消息的请求直接执行视图。
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if (not current_app.config.get('PAGE_CACHE_ENABLED', True)
+                or 'cursor' in request.args or session.get('_flashes')):
+            return view(*args, **kwargs)
+
+        cache = get_page_cache()
+        key = (current_user.id, data_etag(current_user.id), request.path,
+               tuple(sorted(request.args.items(multi=True))))
+        body = cache.get(key)
+        if body is not None:
+            response = make_response(body)
+            response.headers['X-Page-Cache'] = 'hit'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        # 视图渲染过程中可能产生新的闪现消息，此时页面不可复用
+        if response.status_code == 200 and not session.get('_flashes'):
+            cache.set(key, response.get_data())
+            response.headers['X-Page-Cache'] = 'miss'
+        return response
+
+    return wrapper
@@ -0,0 +1,112 @@
+"""
+校园待办清单系统 - 任务列表游标分页（keyset pagination）
+
+每种排序方式都以 Task.id 作为稳定的次级排序键，游标记录上一页最后一条
+任务的 (排序值, id)，下一页直接从该位置继续扫描索引，翻页深度不影响性能。
+"""
+import base64
+import json
+from datetime import datetime
+from app import db
+from app.models import Task
+
+SORT_MODES = ('created_at', 'deadline', 'priority')
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无效"""
+
+
+def normalize_sort(sort_by):
+    """将未知的排序参数归一为默认的按创建时间排序"""
+    return sort_by if sort_by in SORT_MODES else 'created_at'
+
+
+def order_by_clauses(sort_by):
+    """返回排序子句，末尾统一追加 id 作为稳定的次级排序键"""
+    sort_by = normalize_sort(sort_by)
+    if sort_by == 'deadline':
+        return [Task.deadline.asc().nullslast(), Task.id.asc()]
+    if sort_by == 'priority':
+        return [Task.priority_rank.asc(), Task.id.asc()]
+    return [Task.created_at.desc(), Task.id.desc()]
+
+
+def sort_column(sort_by):
+    """当前排序方式使用的列（生成游标时需要读取）"""
+    return {'deadline': Task.deadline, 'priority': Task.priority_rank}.get(sort_by, Task.created_at)
+
+
+def sort_value(task, sort_by):
+    """取任务在当前排序方式下的排序值"""
+    if sort_by == 'deadline':
+        return task.deadline
+    if sort_by == 'priority':
+        return task.priority_rank
+    return task.created_at
+
+
+def encode_cursor(sort_by, task):
+    """生成指向 task 之后位置的不透明游标"""
+    value = sort_value(task, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort_by, 'v': value, 'id': task.id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by):
+    """解析游标，返回 (排序值, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload['s'] != sort_by:
+            raise InvalidCursorError('游标与排序方式不匹配')
+        value, last_id = payload['v'], int(payload['id'])
+        if sort_by == 'priority':
+            value = int(value)
+        elif value is not None:
+            value = datetime.fromisoformat(value)
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise InvalidCursorError('无效的分页游标')
+    return value, last_id
+
+
+def keyset_filter(sort_by, value, last_id):
+    """返回“位于游标之后”的过滤条件，与 order_by_clauses() 的顺序一致"""
+    if sort_by == 'deadline':
+        # 升序且空值在后：空值区间内只按 id 继续
+        if value is None:
+            return db.and_(Task.deadline.is_(None), Task.id > last_id)
+        return db.or_(
+            Task.deadline > value,
+            db.and_(Task.deadline == value, Task.id > last_id),
+            Task.deadline.is_(None)
+        )
+    if sort_by == 'priority':
+        return db.or_(
+            Task.priority_rank > value,
+            db.and_(Task.priority_rank == value, Task.id > last_id)
+        )
+    return db.or_(
+        Task.created_at < value,
+        db.and_(Task.created_at == value, Task.id < last_id)
+    )
+
+
+def paginate_tasks(query, sort_by, cursor=None, limit=50):
+    """对已排序的任务查询取一页，返回 (任务列表, 下一页游标或None)"""
+    sort_by = normalize_sort(sort_by)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by)
+        query = query.filter(keyset_filter(sort_by, value, last_id))
+
+    # 多取一条用于判断是否还有下一页
+    tasks = query.limit(limit + 1).all()
+    if len(tasks) <= limit:
+        return tasks, None
+
+    tasks = tasks[:limit]
+    return tasks, encode_cursor(sort_by, tasks[-1])
@@ -0,0 +1,114 @@
+"""
+校园待办清单系统 - 密码哈希
+
+PBKDF2 等密码哈希刻意消耗大量 CPU，在请求线程中同步计算会在注册/登录
+高峰时占满所有工作线程。这里把哈希计算交给进程池执行：同时在途的哈希
+任务数受信号量限制，排队超过 PASSWORD_HASH_QUEUE_TIMEOUT 秒即放弃并
+抛出 PasswordHasherBusy，由路由返回 503。哈希参数可配置，参数变化后
+用户下次登录时自动按新参数重新哈希。
+"""
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import (generate_password_hash, check_password_hash,
+                               DEFAULT_PBKDF2_ITERATIONS)
+
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+DEFAULT_SALT_LENGTH = 16
+
+
+class PasswordHasherBusy(RuntimeError):
+    """哈希任务排队超时"""
+
+
+def normalize_method(method):
+    """补全哈希方法的默认参数，与 Werkzeug 写入哈希值的前缀一致"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        digest = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{digest}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = (args + ['32768', '8', '1'][len(args):])[:3]
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def _generate(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """受并发上限约束的密码哈希执行器；workers 为 0 时在调用线程中计算"""
+
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+                 workers=0, max_concurrency=32, queue_timeout=5.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy('密码哈希队列已满')
+        try:
+            if not self.workers:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """哈希值的算法参数或盐长度与当前配置不一致"""
+        method, _, rest = pwhash.partition('$')
+        salt, _, _ = rest.partition('$')
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# 无应用上下文时（如离线脚本）在调用线程中直接计算
+_inline_hasher = PasswordHasher()
+
+
+def init_app(app):
+    """按配置为应用创建密码哈希执行器"""
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 0),
+        max_concurrency=app.config.get('PASSWORD_HASH_MAX_CONCURRENCY', 32),
+        queue_timeout=app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5.0)
+    )
+
+
+def get_password_hasher():
+    """当前应用的密码哈希执行器"""
+    if has_app_context() and 'password_hasher' in current_app.extensions:
+        return current_app.extensions['password_hasher']
+    return _inline_hasher
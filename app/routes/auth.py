@@ -5,9 +5,31 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.passwords import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
+# 密码哈希排队超时时的提示
+BUSY_MESSAGE = '当前请求人数较多，请稍后重试'
+BUSY_RETRY_AFTER = 5
+
+
+def rehash_after_login(user, password):
+    """登录成功后按需升级密码哈希；哈希队列繁忙时跳过，下次登录再试"""
+    try:
+        if user.rehash_password(password):
+            db.session.commit()
+    except PasswordHasherBusy:
+        pass
+
+
+def busy_api_response():
+    """哈希队列繁忙时的API响应"""
+    response = jsonify({'error': BUSY_MESSAGE})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(BUSY_RETRY_AFTER)
+    return response
+
 
 @auth_bp.route('/')
 def index():
@@ -59,7 +81,11 @@ def register():
         
         # 创建用户
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('register.html', username=username, email=email), 503
         
         db.session.add(user)
         db.session.commit()
@@ -84,10 +110,18 @@ def login():
         # 验证用户
         user = User.query.filter_by(username=username).first()
         
-        if user is None or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('login.html', username=username), 503
+        
+        if not valid:
             flash('用户名或密码错误', 'danger')
             return render_template('login.html', username=username)
         
+        rehash_after_login(user, password)
+        
         # 登录用户
         login_user(user, remember=bool(remember))
         
@@ -143,7 +177,10 @@ def api_register():
     
     # 创建用户
     user = User(username=username, email=email)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except PasswordHasherBusy:
+        return busy_api_response()
     
     db.session.add(user)
     db.session.commit()
@@ -167,9 +204,16 @@ def api_login():
     
     user = User.query.filter_by(username=username).first()
     
-    if user is None or not user.check_password(password):
+    try:
+        valid = user is not None and user.check_password(password)
+    except PasswordHasherBusy:
+        return busy_api_response()
+    
+    if not valid:
         return jsonify({'error': '用户名或密码错误'}), 401
     
+    rehash_after_login(user, password)
+    
     login_user(user)
     
     return jsonify({
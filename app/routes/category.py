@@ -5,10 +5,19 @@ from flask import Blueprint, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import Category, Task
+from app.versioning import etag_by_data_version
+from app.category_cache import get_categories
+from app.counters import move_category
 
 category_bp = Blueprint('category', __name__)
 
 
+def uncategorize_tasks(category_id):
+    """将分类下的任务批量设为未分类，任务计数随之并入未分类"""
+    move_category(db.session, category_id)
+    Task.query.filter_by(category_id=category_id).update({'category_id': None})
+
+
 @category_bp.route('/categories/create', methods=['POST'])
 @login_required
 def create_category():
@@ -59,7 +68,7 @@ def delete_category(category_id):
         return redirect(url_for('task.task_list'))
     
     # 将该分类下的任务设为未分类
-    Task.query.filter_by(category_id=category_id).update({'category_id': None})
+    uncategorize_tasks(category_id)
     
     name = category.name
     db.session.delete(category)
@@ -73,15 +82,17 @@ def delete_category(category_id):
 
 @category_bp.route('/api/categories', methods=['GET'])
 @login_required
+@etag_by_data_version
 def api_get_categories():
     """获取分类列表API"""
-    preset_categories = Category.query.filter_by(is_preset=True).all()
-    user_categories = Category.query.filter_by(user_id=current_user.id).all()
-    
-    all_categories = preset_categories + user_categories
+    all_categories = get_categories(current_user.id)
+    task_counts = Category.task_counts(current_user.id)
     
     return jsonify({
-        'data': [category.to_dict() for category in all_categories],
+        'data': [
+            category.to_dict(task_count=task_counts.get(category.id, 0))
+            for category in all_categories
+        ],
         'count': len(all_categories)
     }), 200
 
@@ -120,7 +131,7 @@ def api_create_category():
     
     return jsonify({
         'message': '分类创建成功',
-        'data': category.to_dict()
+        'data': category.to_dict(task_count=0)
     }), 201
 
 
@@ -140,7 +151,7 @@ def api_delete_category(category_id):
         return jsonify({'error': '无权删除该分类'}), 403
     
     # 将该分类下的任务设为未分类
-    Task.query.filter_by(category_id=category_id).update({'category_id': None})
+    uncategorize_tasks(category_id)
     
     db.session.delete(category)
     db.session.commit()
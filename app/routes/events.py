@@ -0,0 +1,67 @@
+"""
+变更事件推送路由（Server-Sent Events）
+"""
+import json
+import time
+from flask import Blueprint, Response, current_app
+from flask_login import login_required, current_user
+from app.events import get_event_hub, SubscriberClosed
+
+events_bp = Blueprint('events', __name__)
+
+
+def format_event(data, event=None, event_id=None):
+    """编码一条 SSE 消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(hub, subscriber, heartbeat, max_seconds, retry_ms):
+    """逐条输出事件；空闲时发送注释行作为心跳，超过 max_seconds 后结束让客户端重连"""
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield f'retry: {retry_ms}\n: connected\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = subscriber.get(timeout=min(heartbeat, remaining))
+            except SubscriberClosed as e:
+                # 读取过慢被断开：客户端重连后应通过 /api/tasks/changes 补齐
+                yield format_event({'reason': e.reason}, event='reset')
+                return
+            if event is None:
+                yield ': heartbeat\n\n'
+            else:
+                yield format_event(event, event='changes', event_id=event['id'])
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+@events_bp.route('/api/events', methods=['GET'])
+@login_required
+def api_events():
+    """当前用户的任务/分类变更事件流（text/event-stream）
+
+    连接期间不持有应用上下文与数据库会话。
+    """
+    config = current_app.config
+    hub = get_event_hub()
+    subscriber = hub.subscribe(current_user.id)
+    stream = event_stream(
+        hub, subscriber,
+        heartbeat=config['EVENTS_HEARTBEAT_SECONDS'],
+        max_seconds=config['EVENTS_MAX_STREAM_SECONDS'],
+        retry_ms=config['EVENTS_RETRY_MS']
+    )
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # 关闭反向代理（nginx）的响应缓冲
+        'X-Accel-Buffering': 'no'
+    })
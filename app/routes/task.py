@@ -1,11 +1,27 @@
 """
 任务管理路由
 """
+import csv
+import io
 from datetime import datetime, date
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify,
+                   current_app, abort, Response, stream_with_context)
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, selectinload, load_only
 from app import db
 from app.models import Task, Category
+from app.pagination import paginate_tasks, order_by_clauses, normalize_sort, sort_column, InvalidCursorError
+from app.search import keyword_filter, search_tasks
+from app.suggest import get_suggestion_index
+from app.category_cache import get_categories, get_category_cache
+from app.user_cache import get_user_cache
+from app.page_cache import cache_page, get_page_cache
+from app.events import get_event_hub
+from app.changes import record_change
+from app.versioning import etag_by_data_version
+from app import counters
+from app.sync import get_changes, InvalidSyncTokenError, SyncTokenExpiredError
+from app.deadlines import DEADLINE_FILTERS, deadline_conditions, due_counts_by_day, utc_today
 
 task_bp = Blueprint('task', __name__)
 
@@ -14,6 +30,7 @@ task_bp = Blueprint('task', __name__)
 
 @task_bp.route('/tasks')
 @login_required
+@cache_page
 def task_list():
     """任务列表页面"""
     # 获取筛选参数
@@ -22,78 +39,41 @@ def task_list():
     sort_by = request.args.get('sort', 'created_at')
     search_keyword = request.args.get('search', '').strip()
     
-    # 构建查询
-    query = Task.query.filter_by(user_id=current_user.id)
+    cursor = request.args.get('cursor')
     
-    # 应用筛选
-    if filter_type == 'today':
-        today = date.today()
-        query = query.filter(
-            db.func.date(Task.deadline) == today,
-            Task.is_completed == False
-        )
-    elif filter_type == 'overdue':
-        query = query.filter(
-            Task.deadline < datetime.utcnow(),
-            Task.is_completed == False
-        )
-    elif filter_type == 'completed':
-        query = query.filter(Task.is_completed == True)
-    elif filter_type == 'pending':
-        query = query.filter(Task.is_completed == False)
+    # 列表只显示描述摘要，完整描述不从数据库读取
+    options = [category_loader_option(), *Task.description_preview_options()]
+    query = build_task_query(current_user.id, filter_type, category_id, sort_by, search_keyword,
+                             options=options)
     
-    # 按分类筛选
-    if category_id:
-        query = query.filter(Task.category_id == category_id)
-    
-    # 搜索
-    if search_keyword:
-        query = query.filter(
-            db.or_(
-                Task.title.contains(search_keyword),
-                Task.description.contains(search_keyword)
-            )
+    try:
+        tasks, next_cursor = paginate_tasks(
+            query, sort_by, cursor, current_app.config['TASKS_PAGE_SIZE']
         )
+    except InvalidCursorError:
+        abort(400)
     
-    # 排序
-    if sort_by == 'deadline':
-        query = query.order_by(Task.deadline.asc().nullslast())
-    elif sort_by == 'priority':
-        # 自定义优先级排序
-        priority_order = db.case(
-            (Task.priority == 'urgent_important', 1),
-            (Task.priority == 'important_not_urgent', 2),
-            (Task.priority == 'urgent_not_important', 3),
-            (Task.priority == 'not_urgent_not_important', 4),
-            else_=5
-        )
-        query = query.order_by(priority_order)
-    else:
-        query = query.order_by(Task.created_at.desc())
-    
-    tasks = query.all()
+    # “加载更多”请求只返回任务条目片段
+    if cursor and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = current_app.make_response(render_template('_task_items.html', tasks=tasks))
+        response.headers['X-Next-Cursor'] = next_cursor or ''
+        return response
     
     # 获取分类列表
-    preset_categories = Category.query.filter_by(is_preset=True).all()
-    user_categories = Category.query.filter_by(user_id=current_user.id).all()
-    categories = preset_categories + user_categories
+    categories = get_categories(current_user.id)
+    task_counts = Category.task_counts(current_user.id)
     
     # 统计数据
-    stats = {
-        'total': Task.query.filter_by(user_id=current_user.id).count(),
-        'completed': Task.query.filter_by(user_id=current_user.id, is_completed=True).count(),
-        'pending': Task.query.filter_by(user_id=current_user.id, is_completed=False).count(),
-        'overdue': Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.deadline < datetime.utcnow(),
-            Task.is_completed == False
-        ).count()
-    }
+    stats = get_task_stats(current_user.id)
+    total_count = count_filtered_tasks(current_user.id, stats, filter_type, category_id, search_keyword)
     
     return render_template(
         'index.html',
         tasks=tasks,
+        next_cursor=next_cursor,
+        total_count=total_count,
         categories=categories,
+        task_counts=task_counts,
         filter_type=filter_type,
         category_id=category_id,
         sort_by=sort_by,
@@ -125,6 +105,9 @@ def create_task():
         if len(description) > 500:
             errors.append('任务描述不能超过500个字符')
         
+        if not isinstance(priority, str) or priority not in Task.PRIORITY_RANKS:
+            errors.append('无效的优先级')
+        
         # 解析截止日期
         deadline = None
         if deadline_str:
@@ -196,6 +179,9 @@ def edit_task(task_id):
         if len(description) > 500:
             errors.append('任务描述不能超过500个字符')
         
+        if not isinstance(priority, str) or priority not in Task.PRIORITY_RANKS:
+            errors.append('无效的优先级')
+        
         # 解析截止日期
         deadline = None
         if deadline_str:
@@ -272,6 +258,7 @@ def complete_task(task_id):
 
 @task_bp.route('/api/tasks', methods=['GET'])
 @login_required
+@etag_by_data_version
 def api_get_tasks():
     """获取任务列表API"""
     filter_type = request.args.get('filter', 'all')
@@ -279,61 +266,88 @@ def api_get_tasks():
     sort_by = request.args.get('sort', 'created_at')
     search_keyword = request.args.get('search', '').strip()
     
-    query = Task.query.filter_by(user_id=current_user.id)
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', current_app.config['TASKS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['TASKS_MAX_PAGE_SIZE']))
     
-    # 应用筛选
-    if filter_type == 'today':
-        today = date.today()
-        query = query.filter(
-            db.func.date(Task.deadline) == today,
-            Task.is_completed == False
-        )
-    elif filter_type == 'overdue':
-        query = query.filter(
-            Task.deadline < datetime.utcnow(),
-            Task.is_completed == False
-        )
-    elif filter_type == 'completed':
-        query = query.filter(Task.is_completed == True)
-    elif filter_type == 'pending':
-        query = query.filter(Task.is_completed == False)
+    try:
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if category_id:
-        query = query.filter(Task.category_id == category_id)
+    options = field_load_options(fields, sort_by) if fields else None
+    query = build_task_query(current_user.id, filter_type, category_id, sort_by, search_keyword,
+                             options=options)
     
-    if search_keyword:
-        query = query.filter(
-            db.or_(
-                Task.title.contains(search_keyword),
-                Task.description.contains(search_keyword)
-            )
-        )
+    try:
+        tasks, next_cursor = paginate_tasks(query, sort_by, cursor, limit)
+    except InvalidCursorError:
+        return jsonify({'error': '无效的分页游标'}), 400
     
-    # 排序
-    if sort_by == 'deadline':
-        query = query.order_by(Task.deadline.asc().nullslast())
-    elif sort_by == 'priority':
-        priority_order = db.case(
-            (Task.priority == 'urgent_important', 1),
-            (Task.priority == 'important_not_urgent', 2),
-            (Task.priority == 'urgent_not_important', 3),
-            (Task.priority == 'not_urgent_not_important', 4),
-            else_=5
-        )
-        query = query.order_by(priority_order)
-    else:
-        query = query.order_by(Task.created_at.desc())
-    
-    tasks = query.all()
+    return jsonify({
+        'data': Task.to_dicts(tasks, fields=fields),
+        'count': len(tasks),
+        'next_cursor': next_cursor
+    }), 200
+
+
+@task_bp.route('/api/tasks/changes', methods=['GET'])
+@login_required
+def api_task_changes():
+    """任务增量同步API（?since=上次返回的 next_since，不传时全量同步）
+
+    客户端应先删除 deleted 中的任务，再按 id 覆盖写入 changed 中的任务。
+    """
+    since = request.args.get('since') or None
+    limit = request.args.get('limit', current_app.config['TASKS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['TASKS_MAX_PAGE_SIZE']))
+    
+    try:
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # 同步位置需要修改时间
+    options = field_load_options(fields, extra=[Task.updated_at]) if fields else [category_loader_option()]
+    try:
+        changed, deleted, next_since, has_more = get_changes(current_user.id, since, limit, options)
+    except SyncTokenExpiredError as e:
+        return jsonify({'error': str(e), 'resync': True}), 410
+    except InvalidSyncTokenError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'data': [task.to_dict() for task in tasks],
-        'count': len(tasks)
+        'data': {
+            'changed': Task.to_dicts(changed, fields=fields),
+            'deleted': deleted
+        },
+        'next_since': next_since,
+        'has_more': has_more
     }), 200
 
 
+@task_bp.route('/api/tasks/export', methods=['GET'])
+@login_required
+def api_export_tasks():
+    """导出任务API（流式输出，内存占用与任务数量无关）"""
+    export_format = request.args.get('format', 'csv')
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': '不支持的导出格式'}), 400
+    
+    mimetype, generate = EXPORT_FORMATS[export_format]
+    filename = f'tasks_{date.today().isoformat()}.{export_format}'
+    
+    return Response(
+        stream_with_context(generate(current_user.id)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
 @task_bp.route('/api/tasks/<int:task_id>', methods=['GET'])
 @login_required
+@etag_by_data_version
 def api_get_task(task_id):
     """获取单个任务API"""
     task = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
@@ -353,47 +367,13 @@ def api_create_task():
     if not data:
         return jsonify({'error': '无效的请求数据'}), 400
     
-    title = data.get('title', '').strip()
-    description = data.get('description', '').strip()
-    deadline_str = data.get('deadline')
-    priority = data.get('priority', Task.PRIORITY_IMPORTANT_NOT_URGENT)
-    category_id = data.get('category_id')
-    
-    # 验证
-    if not title:
-        return jsonify({'error': '任务标题不能为空'}), 400
-    
-    if len(title) > 50:
-        return jsonify({'error': '任务标题不能超过50个字符'}), 400
-    
-    if description and len(description) > 500:
-        return jsonify({'error': '任务描述不能超过500个字符'}), 400
-    
-    # 解析截止日期
-    deadline = None
-    if deadline_str:
-        try:
-            deadline = datetime.fromisoformat(deadline_str.replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({'error': '截止日期格式不正确'}), 400
-    
-    # 验证分类
-    if category_id:
-        category = Category.query.get(category_id)
-        if not category:
-            return jsonify({'error': '分类不存在'}), 400
-        if not category.is_preset and category.user_id != current_user.id:
-            return jsonify({'error': '无权使用该分类'}), 403
+    try:
+        fields = parse_task_payload(data)
+    except TaskPayloadError as error:
+        return jsonify({'error': error.message}), error.status_code
     
     # 创建任务
-    task = Task(
-        title=title,
-        description=description,
-        deadline=deadline,
-        priority=priority,
-        category_id=category_id,
-        user_id=current_user.id
-    )
+    task = Task(user_id=current_user.id, **fields)
     
     db.session.add(task)
     db.session.commit()
@@ -418,35 +398,14 @@ def api_update_task(task_id):
     if not data:
         return jsonify({'error': '无效的请求数据'}), 400
     
-    # 更新字段
-    if 'title' in data:
-        title = data['title'].strip()
-        if not title:
-            return jsonify({'error': '任务标题不能为空'}), 400
-        if len(title) > 50:
-            return jsonify({'error': '任务标题不能超过50个字符'}), 400
-        task.title = title
-    
-    if 'description' in data:
-        description = data['description'].strip() if data['description'] else ''
-        if len(description) > 500:
-            return jsonify({'error': '任务描述不能超过500个字符'}), 400
-        task.description = description
+    try:
+        fields = parse_task_payload(data, partial=True)
+    except TaskPayloadError as error:
+        return jsonify({'error': error.message}), error.status_code
     
-    if 'deadline' in data:
-        if data['deadline']:
-            try:
-                task.deadline = datetime.fromisoformat(data['deadline'].replace('Z', '+00:00'))
-            except ValueError:
-                return jsonify({'error': '截止日期格式不正确'}), 400
-        else:
-            task.deadline = None
-    
-    if 'priority' in data:
-        task.priority = data['priority']
-    
-    if 'category_id' in data:
-        task.category_id = data['category_id']
+    # 更新字段
+    for name, value in fields.items():
+        setattr(task, name, value)
     
     db.session.commit()
     
@@ -489,6 +448,86 @@ def api_complete_task(task_id):
     }), 200
 
 
+@task_bp.route('/api/stats', methods=['GET'])
+@login_required
+@etag_by_data_version
+def api_get_stats():
+    """任务统计API"""
+    return jsonify({'data': get_task_stats(current_user.id)}), 200
+
+
+@task_bp.route('/api/metrics/caches', methods=['GET'])
+@login_required
+def api_cache_metrics():
+    """进程内缓存的命中率与占用统计、事件推送连接数API（需开启 METRICS_ENABLED）"""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    
+    return jsonify({'data': {
+        'page': get_page_cache().stats(),
+        'user': get_user_cache().stats(),
+        'category': get_category_cache().stats(),
+        'suggest': get_suggestion_index().stats(),
+        'events': get_event_hub().stats()
+    }}), 200
+
+
+@task_bp.route('/api/tasks/due-calendar', methods=['GET'])
+@login_required
+@etag_by_data_version
+def api_due_calendar():
+    """按天统计到期任务数API（?start=YYYY-MM-DD&days=7，默认从今天开始）"""
+    try:
+        start = request.args.get('start')
+        start_day = date.fromisoformat(start) if start else utc_today()
+    except ValueError:
+        return jsonify({'error': '日期格式不正确'}), 400
+    
+    days = request.args.get('days', 7, type=int)
+    if days < 1 or days > current_app.config['DUE_CALENDAR_MAX_DAYS']:
+        return jsonify({'error': f'days 应为 1-{current_app.config["DUE_CALENDAR_MAX_DAYS"]}'}), 400
+    
+    return jsonify({'data': due_counts_by_day(current_user.id, start_day, days)}), 200
+
+
+@task_bp.route('/api/tasks/batch', methods=['POST'])
+@login_required
+def api_batch_tasks():
+    """批量操作任务API
+
+    请求体 {"operations": [{"op": "create|update|complete|delete", "id": .., "data": {..}}, ...]}，
+    先逐项校验（规则与单条接口一致），全部通过后在同一事务中执行；任一项失败则整批不执行。
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': '无效的请求数据'}), 400
+    
+    max_operations = current_app.config['BATCH_MAX_OPERATIONS']
+    if len(operations) > max_operations:
+        return jsonify({'error': f'单次最多提交{max_operations}个操作'}), 400
+    
+    results, plan = plan_batch_operations(current_user.id, operations)
+    
+    if not all(result['success'] for result in results):
+        return jsonify({
+            'error': '批量操作校验失败，未执行任何修改',
+            'data': results
+        }), 400
+    
+    if not apply_batch_operations(current_user.id, plan, results):
+        return jsonify({
+            'error': '批量操作的任务已被删除，未执行任何修改',
+            'data': results
+        }), 409
+    
+    return jsonify({
+        'message': '批量操作完成',
+        'data': results
+    }), 200
+
+
 @task_bp.route('/api/tasks/search', methods=['GET'])
 @login_required
 def api_search_tasks():
@@ -498,25 +537,472 @@ def api_search_tasks():
     if not keyword:
         return jsonify({'error': '请输入搜索关键词'}), 400
     
-    tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        db.or_(
-            Task.title.contains(keyword),
-            Task.description.contains(keyword)
-        )
-    ).order_by(Task.created_at.desc()).all()
+    limit = request.args.get('limit', current_app.config['SEARCH_RESULT_LIMIT'], type=int)
+    limit = max(1, min(limit, current_app.config['SEARCH_RESULT_LIMIT']))
+    
+    try:
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # 按相关度排序
+    options = field_load_options(fields) if fields else [category_loader_option()]
+    tasks = search_tasks(current_user.id, keyword, limit, options=options)
     
     return jsonify({
-        'data': [task.to_dict() for task in tasks],
+        'data': Task.to_dicts(tasks, fields=fields),
         'count': len(tasks),
         'keyword': keyword
     }), 200
 
 
+@task_bp.route('/api/tasks/suggest', methods=['GET'])
+@login_required
+def api_suggest_tasks():
+    """搜索建议API（基于内存前缀索引，不查询数据库）"""
+    prefix = request.args.get('prefix', '').strip()
+    limit = request.args.get('limit', current_app.config['SUGGEST_LIMIT'], type=int)
+    limit = max(1, min(limit, current_app.config['SUGGEST_LIMIT']))
+    
+    if not prefix:
+        return jsonify({'data': [], 'prefix': prefix}), 200
+    
+    suggestions = get_suggestion_index().suggest(current_user.id, prefix, limit)
+    
+    return jsonify({'data': suggestions, 'prefix': prefix}), 200
+
+
 # ==================== 辅助函数 ====================
 
+class TaskPayloadError(Exception):
+    """API提交的任务数据校验失败"""
+    
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def parse_task_payload(data, partial=False):
+    """校验API提交的任务数据，返回可直接赋给 Task 的字段字典
+
+    partial=True 用于更新：只校验并返回 data 中出现的字段。
+    校验失败抛出 TaskPayloadError。
+    """
+    fields = {}
+    
+    if not partial or 'title' in data:
+        title = (data.get('title') or '').strip()
+        if not title:
+            raise TaskPayloadError('任务标题不能为空')
+        if len(title) > 50:
+            raise TaskPayloadError('任务标题不能超过50个字符')
+        fields['title'] = title
+    
+    if not partial or 'description' in data:
+        description = (data.get('description') or '').strip()
+        if len(description) > 500:
+            raise TaskPayloadError('任务描述不能超过500个字符')
+        fields['description'] = description
+    
+    # 解析截止日期
+    if not partial or 'deadline' in data:
+        deadline = None
+        if data.get('deadline'):
+            try:
+                deadline = datetime.fromisoformat(data['deadline'].replace('Z', '+00:00'))
+            except (ValueError, TypeError, AttributeError):
+                raise TaskPayloadError('截止日期格式不正确')
+        fields['deadline'] = deadline
+        # 批量接口的 INSERT/UPDATE 语句不经过模型，派生列需一并写入
+        fields['deadline_day'] = Task.deadline_day_of(deadline)
+    
+    if not partial or 'priority' in data:
+        priority = data.get('priority', Task.PRIORITY_IMPORTANT_NOT_URGENT)
+        if not isinstance(priority, str) or priority not in Task.PRIORITY_RANKS:
+            raise TaskPayloadError('无效的优先级')
+        fields['priority'] = priority
+        fields['priority_rank'] = Task.PRIORITY_RANKS[priority]
+    
+    # 验证分类
+    if not partial or 'category_id' in data:
+        category_id = data.get('category_id')
+        if category_id:
+            category = Category.query.get(category_id)
+            if not category:
+                raise TaskPayloadError('分类不存在')
+            if not category.is_preset and category.user_id != current_user.id:
+                raise TaskPayloadError('无权使用该分类', 403)
+        fields['category_id'] = category_id or None
+    
+    return fields
+
+
+def build_task_query(user_id, filter_type='all', category_id=None, sort_by='created_at', search_keyword='',
+                     options=None):
+    """构建任务列表查询（页面与API共用）
+
+    筛选与排序组合与 Task 上的复合索引一一对应，修改时请同步调整索引。
+    options 为加载选项，默认加载全部列并预加载分类。
+    """
+    if options is None:
+        options = [category_loader_option()]
+    query = Task.query.options(*options).filter_by(user_id=user_id)
+    
+    # 应用筛选（今日/逾期/即将到期为截止时间的半开区间，可走索引范围扫描）
+    if filter_type in DEADLINE_FILTERS:
+        query = query.filter(*deadline_conditions(
+            filter_type, upcoming_days=current_app.config['TASKS_UPCOMING_DAYS']
+        ))
+    elif filter_type == 'completed':
+        query = query.filter(Task.is_completed == True)
+    elif filter_type == 'pending':
+        query = query.filter(Task.is_completed == False)
+    
+    # 按分类筛选
+    if category_id:
+        query = query.filter(Task.category_id == category_id)
+    
+    # 搜索（优先走全文索引）
+    if search_keyword:
+        query = query.filter(keyword_filter(search_keyword))
+    
+    # 排序（以 id 作为次级排序键，保证游标分页稳定）
+    query = query.order_by(*order_by_clauses(sort_by))
+    
+    return query
+
+
+BATCH_OPERATIONS = ('create', 'update', 'complete', 'delete')
+
+
+def plan_batch_operations(user_id, operations):
+    """校验批量操作，返回 (逐项结果, 执行计划)"""
+    operations = [op if isinstance(op, dict) else {} for op in operations]
+    
+    # 一次查询确认目标任务归属，并预取涉及的分类（放入会话标识映射，逐项校验时不再查询）
+    target_ids = {op.get('id') for op in operations if op.get('op') in BATCH_OPERATIONS[1:]}
+    target_ids = {task_id for task_id in target_ids if isinstance(task_id, int)}
+    titles = dict(db.session.query(Task.id, Task.title).filter(
+        Task.user_id == user_id,
+        Task.id.in_(target_ids)
+    ).all()) if target_ids else {}
+    
+    category_ids = {
+        op['data'].get('category_id') for op in operations
+        if isinstance(op.get('data'), dict) and isinstance(op['data'].get('category_id'), int)
+    }
+    categories = Category.query.filter(Category.id.in_(category_ids)).all() if category_ids else []
+    
+    # 计划中持有预取分类的引用，保证其在校验期间留在标识映射中
+    plan = {'create': [], 'update': [], 'complete': [], 'delete': [], 'titles': titles,
+            'categories': categories}
+    results = []
+    seen_ids = set()
+    
+    for index, operation in enumerate(operations):
+        op = operation.get('op')
+        result = {'index': index, 'op': op, 'success': True}
+        try:
+            if op not in BATCH_OPERATIONS:
+                raise TaskPayloadError('不支持的操作类型')
+            
+            if op == 'create':
+                payload = operation.get('data')
+                if not isinstance(payload, dict) or not payload:
+                    raise TaskPayloadError('无效的请求数据')
+                plan['create'].append((index, parse_task_payload(payload)))
+                results.append(result)
+                continue
+            
+            task_id = operation.get('id')
+            result['id'] = task_id
+            if task_id not in titles:
+                raise TaskPayloadError('任务不存在', 404)
+            if task_id in seen_ids:
+                raise TaskPayloadError('同一任务在一次批量操作中只能出现一次')
+            seen_ids.add(task_id)
+            
+            if op == 'update':
+                payload = operation.get('data')
+                if not isinstance(payload, dict) or not payload:
+                    raise TaskPayloadError('无效的请求数据')
+                plan['update'].append((index, task_id, parse_task_payload(payload, partial=True)))
+            elif op == 'complete':
+                # 未指定 is_completed 时与单条接口一致：切换完成状态
+                is_completed = operation.get('is_completed')
+                if is_completed is not None and not isinstance(is_completed, bool):
+                    raise TaskPayloadError('is_completed 必须为布尔值')
+                plan['complete'].append((index, task_id, is_completed))
+            else:
+                plan['delete'].append((index, task_id))
+        except TaskPayloadError as error:
+            result.update(success=False, error=error.message, status=error.status_code)
+        results.append(result)
+    
+    return results, plan
+
+
+def lock_batch_targets(session, user_id, task_ids):
+    """以一条空更新锁定目标任务并返回其当前值 {id: 行}
+
+    该语句取得写锁（SQLite）或行锁，之后到提交前其他事务无法修改这些任务，
+    计数增量据此计算，不受校验之后并发写入的影响。
+    """
+    if not task_ids:
+        return {}
+    rows = session.execute(
+        db.update(Task).where(Task.user_id == user_id, Task.id.in_(task_ids))
+        .values(category_id=Task.category_id)
+        .returning(Task.id, Task.category_id, Task.priority, Task.is_completed),
+        execution_options={'synchronize_session': False}
+    )
+    return {row.id: row for row in rows}
+
+
+def apply_batch_operations(user_id, plan, results):
+    """在同一事务中执行已校验的批量操作，并把结果写回 results
+
+    校验之后目标任务已被删除时整批回滚，相应结果标记为失败并返回 False。
+    """
+    session = db.session
+    titles = plan['titles']
+    changed_ids = []
+    
+    try:
+        targets = lock_batch_targets(session, user_id, list(titles))
+        missing = [index for index, task_id, *_ in plan['update'] + plan['complete'] + plan['delete']
+                   if task_id not in targets]
+        if missing:
+            session.rollback()
+            for index in missing:
+                results[index].update(success=False, error='任务不存在', status=404)
+            return False
+        
+        # 批量插入
+        if plan['create']:
+            rows = [dict(fields, user_id=user_id) for _, fields in plan['create']]
+            new_ids = session.scalars(
+                db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+            ).all()
+            for (index, fields), task_id in zip(plan['create'], new_ids):
+                results[index]['id'] = task_id
+                changed_ids.append((index, task_id))
+                record_change(session, 'task', 'create', user_id, task_id,
+                              {'title': fields['title'], 'old_title': fields['title']})
+                counters.add_task(session, user_id, fields['category_id'], fields['priority'], False)
+        
+        # 按主键批量更新
+        if plan['update']:
+            session.execute(db.update(Task), [
+                dict(fields, id=task_id) for _, task_id, fields in plan['update']
+            ])
+            for index, task_id, fields in plan['update']:
+                changed_ids.append((index, task_id))
+                old = targets[task_id]
+                counters.add_task(session, user_id, old.category_id, old.priority, old.is_completed, sign=-1)
+                counters.add_task(session, user_id, fields.get('category_id', old.category_id),
+                                  fields.get('priority', old.priority), old.is_completed)
+                record_change(session, 'task', 'update', user_id, task_id, {
+                    'title': fields.get('title', titles[task_id]),
+                    'old_title': titles[task_id]
+                })
+        
+        # 完成状态：按目标值分组，每组一条 UPDATE ... WHERE id IN (...)
+        groups = {}
+        for index, task_id, is_completed in plan['complete']:
+            groups.setdefault(is_completed, []).append(task_id)
+            old = targets[task_id]
+            done = not old.is_completed if is_completed is None else is_completed
+            counters.add_delta(session, user_id, old.category_id, old.priority, 0,
+                               int(bool(done)) - int(bool(old.is_completed)))
+            changed_ids.append((index, task_id))
+            record_change(session, 'task', 'update', user_id, task_id,
+                          {'title': titles[task_id], 'old_title': titles[task_id]})
+        for is_completed, task_ids in groups.items():
+            value = db.not_(Task.is_completed) if is_completed is None else is_completed
+            session.execute(
+                db.update(Task).where(Task.id.in_(task_ids)).values(is_completed=value),
+                execution_options={'synchronize_session': False}
+            )
+        
+        # 批量删除
+        if plan['delete']:
+            task_ids = [task_id for _, task_id in plan['delete']]
+            session.execute(
+                db.delete(Task).where(Task.id.in_(task_ids)),
+                execution_options={'synchronize_session': False}
+            )
+            for _, task_id in plan['delete']:
+                record_change(session, 'task', 'delete', user_id, task_id,
+                              {'title': titles[task_id], 'old_title': titles[task_id]})
+                old = targets[task_id]
+                counters.add_task(session, user_id, old.category_id, old.priority, old.is_completed, sign=-1)
+        
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    
+    # 一次查询取回新建/修改后的任务
+    if changed_ids:
+        tasks = Task.query.options(category_loader_option()).filter(
+            Task.id.in_([task_id for _, task_id in changed_ids])
+        ).populate_existing().all()
+        by_id = {task.id: data for task, data in zip(tasks, Task.to_dicts(tasks))}
+        for index, task_id in changed_ids:
+            results[index]['data'] = by_id[task_id]
+    return True
+
+
+def parse_fields_arg():
+    """解析 ?fields=id,title,...，未指定时返回 None（输出全部字段）
+
+    输出总是包含 id；含未知字段时抛出 ValueError。
+    """
+    value = request.args.get('fields', '').strip()
+    if not value:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in Task.SERIALIZED_FIELDS]
+    if unknown:
+        raise ValueError(f'未知的字段: {", ".join(unknown)}')
+    return tuple(dict.fromkeys(['id', *names]))
+
+
+def field_load_options(fields, sort_by=None, extra=()):
+    """只查询字段子集（及分页游标所需排序列、extra 中的列）依赖的列，不输出分类名称时不预加载分类"""
+    columns = Task.columns_for_fields(fields) + list(extra)
+    if sort_by is not None:
+        columns.append(sort_column(normalize_sort(sort_by)))
+    options = [load_only(*columns)]
+    if 'category_name' in fields:
+        options.append(category_loader_option())
+    return options
+
+
+def category_loader_option():
+    """根据配置返回 Task.category 的预加载选项，避免序列化时逐条查询分类"""
+    if current_app.config.get('TASK_CATEGORY_LOADING') == 'selectin':
+        return selectinload(Task.category)
+    return joinedload(Task.category)
+
+
+def iter_export_tasks(user_id):
+    """按创建时间倒序分批读取用户的全部任务（服务端游标，不一次性载入）"""
+    query = Task.query.options(category_loader_option()).filter_by(
+        user_id=user_id
+    ).order_by(Task.created_at.desc(), Task.id.desc())
+    return query.yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+
+
+# 与前端原 convertToCSV() 保持一致的列
+EXPORT_CSV_HEADERS = ['ID', '标题', '描述', '截止日期', '优先级', '分类', '是否完成', '创建时间']
+
+
+def generate_csv(user_id):
+    """逐行生成CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+    
+    writer.writerow(EXPORT_CSV_HEADERS)
+    yield flush()
+    
+    for task in iter_export_tasks(user_id):
+        writer.writerow([
+            task.id,
+            task.title or '',
+            task.description or '',
+            task.deadline.isoformat() if task.deadline else '',
+            task.priority_label,
+            task.category.name if task.category else '',
+            '是' if task.is_completed else '否',
+            task.created_at.isoformat() if task.created_at else ''
+        ])
+        yield flush()
+
+
+def generate_ndjson(user_id):
+    """逐行生成NDJSON（每行一个任务对象）"""
+    now = datetime.utcnow()
+    dumps = current_app.json.dumps
+    for task in iter_export_tasks(user_id):
+        yield dumps(task.to_dict(now), ensure_ascii=False, sort_keys=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', generate_csv),
+    'ndjson': ('application/x-ndjson', generate_ndjson),
+}
+
+
+def count_filtered_tasks(user_id, stats, filter_type='all', category_id=None, search_keyword=''):
+    """筛选条件下的任务总数（不受分页影响）
+
+    全部/已完成/未完成（可按分类）由 get_task_stats() 的计数得出，不再查询；
+    截止时间筛选与搜索执行一次 COUNT。
+    """
+    if not search_keyword and filter_type in ('all', 'completed', 'pending'):
+        bucket = stats
+        if category_id:
+            bucket = next((item for item in stats['by_category'] if item['category_id'] == category_id),
+                          {'total': 0, 'completed': 0})
+        return {
+            'all': bucket['total'],
+            'completed': bucket['completed'],
+            'pending': bucket['total'] - bucket['completed']
+        }[filter_type]
+    query = build_task_query(user_id, filter_type, category_id, search_keyword=search_keyword, options=[])
+    return query.order_by(None).with_entities(db.func.count(Task.id)).scalar()
+
+
+def get_task_stats(user_id):
+    """获取任务统计数据
+
+    总数/已完成及按分类、按优先级的细分读取该用户在 task_counters 中的
+    少量计数行，逾期数在截止日期索引上做范围计数，均不扫描全部任务。
+    """
+    rows = counters.get_counters(user_id)
+    
+    stats = {'total': 0, 'completed': 0, 'pending': 0, 'overdue': 0}
+    by_category = {}
+    by_priority = {
+        value: {'priority': value, 'priority_label': label, 'total': 0, 'completed': 0}
+        for value, label in Task.PRIORITY_CHOICES
+    }
+    
+    for category_id, priority, total, done in rows:
+        stats['total'] += total
+        stats['completed'] += done
+        
+        bucket = by_category.setdefault(
+            category_id, {'category_id': category_id, 'total': 0, 'completed': 0}
+        )
+        bucket['total'] += total
+        bucket['completed'] += done
+        
+        bucket = by_priority.setdefault(priority, {
+            'priority': priority,
+            'priority_label': Task.PRIORITY_LABELS.get(priority, '未知'),
+            'total': 0,
+            'completed': 0
+        })
+        bucket['total'] += total
+        bucket['completed'] += done
+    
+    stats['pending'] = stats['total'] - stats['completed']
+    stats['overdue'] = counters.count_overdue(user_id, datetime.utcnow())
+    stats['by_category'] = list(by_category.values())
+    stats['by_priority'] = list(by_priority.values())
+    return stats
+
+
 def get_user_categories():
     """获取用户可用的分类列表"""
-    preset_categories = Category.query.filter_by(is_preset=True).all()
-    user_categories = Category.query.filter_by(user_id=current_user.id).all()
-    return preset_categories + user_categories
\ No newline at end of file
+    return get_categories(current_user.id)
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+校园待办清单系统 - 数据库结构维护
+
+数据库结构由显式的初始化步骤（flask init-db / run.py）建立并升级，
+结构版本号记录在 SQLite 文件头的 user_version 中。create_app() 不再
+执行 db.create_all()，只读取一次版本号与 SCHEMA_VERSION 比较。
+"""
+import logging
+from app import db
+from app.models import Task
+from app.counters import rebuild_counters
+from app.search import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+# 当前模型对应的数据库结构版本，结构变更时递增并在 MIGRATIONS 中登记升级步骤
+SCHEMA_VERSION = 6
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库结构版本与代码不一致"""
+
+
+def get_schema_version(connection):
+    """读取数据库结构版本（非 SQLite 数据库返回 None）"""
+    if connection.dialect.name != 'sqlite':
+        return None
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def set_schema_version(connection, version):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+
+
+def ensure_indexes():
+    """为已有数据库补建模型中声明但尚不存在的索引
+
+    db.create_all() 只会为新建的表创建索引，旧库需要调用本函数补齐。
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+
+def add_column(table, column_ddl):
+    """为已有表增加列（列已存在时跳过），返回是否新增"""
+    name = column_ddl.split()[0]
+    columns = {column['name'] for column in db.inspect(db.engine).get_columns(table)}
+    if name in columns:
+        return False
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column_ddl}')
+    return True
+
+
+def migrate_deadline_day():
+    """版本 2：增加 tasks.deadline_day 并按已有截止时间回填"""
+    add_column('tasks', 'deadline_day DATE')
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            'UPDATE tasks SET deadline_day = date(deadline) WHERE deadline IS NOT NULL'
+        )
+
+
+def migrate_priority_rank():
+    """版本 3：增加 tasks.priority_rank 并按优先级回填（未知优先级排在最后）"""
+    add_column('tasks', f'priority_rank SMALLINT NOT NULL DEFAULT {Task.UNKNOWN_PRIORITY_RANK}')
+    rank = db.case(Task.PRIORITY_RANKS, value=Task.priority, else_=Task.UNKNOWN_PRIORITY_RANK)
+    with db.engine.begin() as connection:
+        connection.execute(db.update(Task.__table__).values(priority_rank=rank))
+
+
+def migrate_password_hash_length():
+    """版本 6：users.password_hash 由 VARCHAR(128) 加宽到 VARCHAR(255)
+
+    SQLite 不检查 VARCHAR 长度，无需修改表结构。
+    """
+    statement = {
+        'postgresql': 'ALTER TABLE users ALTER COLUMN password_hash TYPE VARCHAR(255)',
+        'mysql': 'ALTER TABLE users MODIFY password_hash VARCHAR(255) NOT NULL',
+    }.get(db.engine.dialect.name)
+    if statement is None:
+        return
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(statement)
+
+
+# (目标版本, 升级函数)：按顺序对已有数据库执行，新建的数据库直接由 create_all() 建立最新结构
+MIGRATIONS = [
+    (2, migrate_deadline_day),
+    (3, migrate_priority_rank),
+    # 版本 4：新增 task_counters 表（由 create_all 建立），根据已有任务生成计数
+    (4, rebuild_counters),
+    # 版本 5：新增 task_tombstones 表与 ix_tasks_user_updated 索引（由 create_all/ensure_indexes 建立）
+    (6, migrate_password_hash_length),
+]
+
+
+def bootstrap_schema():
+    """建立或升级数据库结构，返回升级前的版本号
+
+    已是最新版本时不做任何操作；旧库（版本号为 0 但已有数据表）依次执行
+    MIGRATIONS 中的升级步骤，再补建缺失的表、索引和全文索引。
+    """
+    with db.engine.connect() as connection:
+        current = get_schema_version(connection)
+    if current == SCHEMA_VERSION:
+        return current
+
+    existing = db.inspect(db.engine).has_table('users')
+    db.create_all()
+    if existing:
+        for version, migrate in MIGRATIONS:
+            if version > (current or 0):
+                logger.info('升级数据库结构到版本 %s', version)
+                migrate()
+    ensure_indexes()
+    ensure_search_index()
+
+    with db.engine.begin() as connection:
+        set_schema_version(connection, SCHEMA_VERSION)
+    return current
+
+
+def check_schema_version(app):
+    """启动时检查数据库结构版本（只执行一次 PRAGMA 查询）
+
+    SCHEMA_CHECK 为 'error' 时版本不一致直接抛出异常，为 'warn' 时记录
+    警告，为 'off' 时跳过。内存数据库只能在应用创建后建表，不做检查。
+    """
+    mode = app.config.get('SCHEMA_CHECK', 'warn')
+    if mode == 'off':
+        return
+    with app.app_context():
+        engine = db.engine
+        if engine.url.database in (None, '', ':memory:'):
+            return
+        with engine.connect() as connection:
+            version = get_schema_version(connection)
+    if version is None or version == SCHEMA_VERSION:
+        return
+    message = (f'数据库结构版本为 {version}，当前代码需要版本 {SCHEMA_VERSION}，'
+               '请先执行 flask init-db')
+    if mode == 'error':
+        raise SchemaVersionError(message)
+    logger.warning(message)
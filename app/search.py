@@ -0,0 +1,139 @@
+"""
+校园待办清单系统 - 任务全文检索
+
+基于 SQLite FTS5（trigram 分词）为任务标题和描述建立外部内容索引，
+由触发器在任务增删改时同步。trigram 按三字窗口切分，可直接支持中文
+子串匹配，语义与原先的 LIKE '%关键词%' 一致；关键词不足三个字符或
+SQLite 未编译 FTS5 时自动退回 LIKE 查询。
+"""
+import logging
+import weakref
+from sqlalchemy import event, exc
+from app import db
+from app.models import Task
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'tasks_fts'
+
+# trigram 分词要求关键词至少三个字符
+MIN_FTS_KEYWORD_LENGTH = 3
+
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+fts_table = db.table(FTS_TABLE, db.column('rowid'), db.column('rank'))
+
+# 各数据库引擎上全文索引是否可用
+_fts_enabled = weakref.WeakKeyDictionary()
+
+
+def create_fts(connection):
+    """在给定连接上创建全文索引表及同步触发器，返回是否成功"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        for statement in FTS_DDL:
+            connection.exec_driver_sql(statement)
+    except exc.OperationalError as error:
+        # 未编译 FTS5 或 trigram 分词器（SQLite < 3.34）
+        logger.warning('全文索引不可用，搜索将使用 LIKE 查询: %s', error)
+        return False
+    return True
+
+
+def drop_fts(connection):
+    """删除全文索引表（触发器随 tasks 表一并删除）"""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+@event.listens_for(Task.__table__, 'after_create')
+def _after_tasks_create(target, connection, **kw):
+    _fts_enabled[connection.engine] = create_fts(connection)
+
+
+@event.listens_for(Task.__table__, 'before_drop')
+def _before_tasks_drop(target, connection, **kw):
+    drop_fts(connection)
+    _fts_enabled[connection.engine] = False
+
+
+def ensure_search_index():
+    """为已有数据库建立全文索引并根据 tasks 表重建索引内容"""
+    with db.engine.begin() as connection:
+        enabled = create_fts(connection)
+        if enabled:
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    _fts_enabled[db.engine] = enabled
+    return enabled
+
+
+def fts_enabled():
+    """当前数据库是否已建立全文索引"""
+    engine = db.engine
+    if engine not in _fts_enabled:
+        enabled = False
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                enabled = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+                ).first() is not None
+        _fts_enabled[engine] = enabled
+    return _fts_enabled[engine]
+
+
+def use_fts(keyword):
+    """该关键词是否走全文索引"""
+    return len(keyword) >= MIN_FTS_KEYWORD_LENGTH and fts_enabled()
+
+
+def match_expression(keyword):
+    """将关键词转换为 FTS5 短语查询（按子串匹配，转义双引号）"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def like_filter(keyword):
+    """LIKE 子串匹配条件（全文索引不可用时的回退方案）"""
+    return db.or_(
+        Task.title.contains(keyword),
+        Task.description.contains(keyword)
+    )
+
+
+def fts_match(keyword):
+    """全文索引匹配条件"""
+    return db.literal_column(FTS_TABLE).op('MATCH')(match_expression(keyword))
+
+
+def keyword_filter(keyword):
+    """任务列表的关键词过滤条件，可与其他筛选及排序组合"""
+    if not use_fts(keyword):
+        return like_filter(keyword)
+    matched_ids = db.select(fts_table.c.rowid).where(fts_match(keyword))
+    return Task.id.in_(matched_ids)
+
+
+def search_tasks(user_id, keyword, limit, options=()):
+    """按相关度搜索用户的任务，最多返回 limit 条"""
+    query = Task.query.options(*options).filter(Task.user_id == user_id)
+    if use_fts(keyword):
+        query = query.join(fts_table, fts_table.c.rowid == Task.id).filter(
+            fts_match(keyword)
+        ).order_by(fts_table.c.rank, Task.id.desc())
+    else:
+        query = query.filter(like_filter(keyword)).order_by(Task.created_at.desc(), Task.id.desc())
+    return query.limit(limit).all()
@@ -20,8 +20,17 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // 绑定键盘快捷键
     initKeyboardShortcuts();
+    
+    // 初始化搜索建议
+    initSearchAutocomplete();
+    
+    // 订阅变更推送
+    initChangeEvents();
 });
 
+// 本页面的客户端标识，写请求携带它，推送时忽略自己触发的变更
+var CLIENT_ID = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
 // ==================== 工具提示初始化 ====================
 function initTooltips() {
     var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
@@ -198,7 +207,8 @@ function toggleTaskComplete(taskId, button) {
         method: 'POST',
         headers: {
             'X-Requested-With': 'XMLHttpRequest',
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'X-Client-Id': CLIENT_ID
         }
     })
     .then(function(response) {
@@ -231,6 +241,9 @@ function toggleTaskComplete(taskId, button) {
             
             // 显示提示
             showToast(data.is_completed ? '任务已完成' : '任务已恢复', 'success');
+            
+            // 同步统计卡片
+            refreshStats();
         } else {
             button.innerHTML = originalContent;
             showToast('操作失败，请重试', 'danger');
@@ -246,6 +259,66 @@ function toggleTaskComplete(taskId, button) {
     });
 }
 
+// ==================== 统计数据刷新 ====================
+function refreshStats() {
+    var statsCard = document.getElementById('statsCard');
+    
+    if (!statsCard) {
+        return;
+    }
+    
+    fetch('/api/stats')
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(result) {
+            ['total', 'completed', 'pending', 'overdue'].forEach(function(key) {
+                var el = statsCard.querySelector('[data-stat="' + key + '"]');
+                if (el) {
+                    el.textContent = result.data[key];
+                }
+            });
+        })
+        .catch(function(error) {
+            console.error('Stats error:', error);
+        });
+}
+
+// ==================== 变更推送 ====================
+function initChangeEvents() {
+    // 仅任务列表页订阅；浏览器断线后按服务端 retry 自动重连
+    if (!document.getElementById('statsCard') || !window.EventSource) {
+        return;
+    }
+    
+    var source = new EventSource('/api/events');
+    var notified = false;
+    
+    function notifyChanged() {
+        refreshStats();
+        
+        // 列表内容只提示一次，由用户决定何时刷新
+        if (!notified) {
+            notified = true;
+            showToast('任务已在其他页面更新，<a href="javascript:location.reload()">刷新</a>查看', 'info');
+        }
+    }
+    
+    source.addEventListener('changes', function(e) {
+        var data = JSON.parse(e.data);
+        if (data.origin !== CLIENT_ID) {
+            notifyChanged();
+        }
+    });
+    
+    // 读取过慢或连接被替换：断开期间可能漏掉变更，同样提示刷新
+    source.addEventListener('reset', notifyChanged);
+    
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+}
+
 // ==================== Toast提示 ====================
 function showToast(message, type) {
     type = type || 'info';
@@ -345,18 +418,50 @@ function initSearchAutocomplete() {
     
     if (searchInput) {
         var debounceTimer;
+        var controller;
+        
+        // 使用 datalist 展示建议
+        var datalist = document.createElement('datalist');
+        datalist.id = 'searchSuggestions';
+        searchInput.parentElement.appendChild(datalist);
+        searchInput.setAttribute('list', datalist.id);
+        searchInput.setAttribute('autocomplete', 'off');
         
         searchInput.addEventListener('input', function() {
             clearTimeout(debounceTimer);
             
             var query = this.value.trim();
             
-            if (query.length >= 2) {
-                debounceTimer = setTimeout(function() {
-                    // 可以在这里添加搜索建议功能
-                    console.log('Searching for:', query);
-                }, 300);
+            if (!query) {
+                datalist.innerHTML = '';
+                return;
             }
+            
+            debounceTimer = setTimeout(function() {
+                // 取消尚未返回的上一次请求
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                
+                fetch('/api/tasks/suggest?prefix=' + encodeURIComponent(query), {signal: controller.signal})
+                    .then(function(response) {
+                        return response.json();
+                    })
+                    .then(function(result) {
+                        datalist.innerHTML = '';
+                        result.data.forEach(function(title) {
+                            var option = document.createElement('option');
+                            option.value = title;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(function(error) {
+                        if (error.name !== 'AbortError') {
+                            console.error('Suggest error:', error);
+                        }
+                    });
+            }, 150);
         });
     }
 }
@@ -406,55 +511,16 @@ function initTheme() {
 }
 
 // ==================== 导出功能（可选） ====================
+// 由服务端流式生成文件，浏览器直接下载，不在前端拼装数据
 function exportTasks(format) {
-    format = format || 'json';
+    format = format || 'csv';
     
-    fetch('/api/tasks')
-        .then(function(response) {
-            return response.json();
-        })
-        .then(function(data) {
-            var content;
-            var filename;
-            var type;
-            
-            if (format === 'json') {
-                content = JSON.stringify(data.data, null, 2);
-                filename = 'tasks_' + new Date().toISOString().slice(0, 10) + '.json';
-                type = 'application/json';
-            } else if (format === 'csv') {
-                content = convertToCSV(data.data);
-                filename = 'tasks_' + new Date().toISOString().slice(0, 10) + '.csv';
-                type = 'text/csv';
-            }
-            
-            downloadFile(content, filename, type);
-        })
-        .catch(function(error) {
-            console.error('Export error:', error);
-            showToast('导出失败', 'danger');
-        });
-}
-
-function convertToCSV(tasks) {
-    var headers = ['ID', '标题', '描述', '截止日期', '优先级', '分类', '是否完成', '创建时间'];
-    var rows = [headers.join(',')];
-    
-    tasks.forEach(function(task) {
-        var row = [
-            task.id,
-            '"' + (task.title || '').replace(/"/g, '""') + '"',
-            '"' + (task.description || '').replace(/"/g, '""') + '"',
-            task.deadline || '',
-            task.priority_label || '',
-            task.category_name || '',
-            task.is_completed ? '是' : '否',
-            task.created_at || ''
-        ];
-        rows.push(row.join(','));
-    });
+    // 兼容旧的 json 参数
+    if (format === 'json') {
+        format = 'ndjson';
+    }
     
-    return rows.join('\n');
+    window.location.href = '/api/tasks/export?format=' + encodeURIComponent(format);
 }
 
 function downloadFile(content, filename, type) {
@@ -476,8 +542,8 @@ function downloadFile(content, filename, type) {
 // ==================== 页面可见性处理 ====================
 document.addEventListener('visibilitychange', function() {
     if (document.visibilityState === 'visible') {
-        // 页面重新可见时可以刷新数据
-        console.log('Page is visible, consider refreshing data');
+        // 页面重新可见时刷新统计数据
+        refreshStats();
     }
 });
 
@@ -0,0 +1,171 @@
+"""
+校园待办清单系统 - 搜索建议
+
+为每个用户在内存中维护一份按标题排序的前缀索引：首次请求时从数据库
+构建，之后随任务写入增量更新（订阅 app.changes.data_changed），总条目
+超出上限时按最近最少使用淘汰整个用户的索引。前缀查询只需一次二分查找，
+不访问任务表。
+
+其他进程（多工作进程部署）的写入不会通知本进程，因此索引记录构建时的
+用户数据版本（app.versioning），本进程的写入同步递增；查询时以一次主键
+查询核对版本，不一致说明有其他进程写入，重新构建。
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from flask import current_app
+from app import db
+from app.changes import data_changed
+from app.models import Task
+from app.versioning import VERSIONED_ENTITIES, get_data_version
+
+
+def _key(title):
+    """前缀匹配使用的归一化键（忽略大小写）"""
+    return title.casefold()
+
+
+class PrefixIndex:
+    """单个用户的有序标题列表，元素为 (归一化键, 原标题)，允许重复标题"""
+
+    def __init__(self, titles=(), version=None):
+        self.entries = sorted((_key(title), title) for title in titles if title)
+        # 索引内容对应的用户数据版本
+        self.version = version
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, title):
+        if title:
+            insort(self.entries, (_key(title), title))
+
+    def remove(self, title):
+        if not title:
+            return
+        entry = (_key(title), title)
+        pos = bisect_left(self.entries, entry)
+        if pos < len(self.entries) and self.entries[pos] == entry:
+            del self.entries[pos]
+
+    def suggest(self, prefix, limit):
+        """返回以 prefix 开头的标题（去重，按字典序）"""
+        prefix = _key(prefix)
+        results = []
+        pos = bisect_left(self.entries, (prefix,))
+        while pos < len(self.entries) and len(results) < limit:
+            key, title = self.entries[pos]
+            if not key.startswith(prefix):
+                break
+            if not results or results[-1] != title:
+                results.append(title)
+            pos += 1
+        return results
+
+
+class SuggestionIndex:
+    """按用户划分的前缀索引集合，带 LRU 淘汰"""
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._building = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def suggest(self, user_id, prefix, limit=8):
+        version, _ = get_data_version(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                return index.suggest(prefix, limit)
+            if index is not None:
+                # 其他进程写入过，丢弃后重新构建
+                del self._indexes[user_id]
+                self._size -= len(index)
+
+        index = self._load(user_id, version)
+        return index.suggest(prefix, limit)
+
+    def _load(self, user_id, version):
+        """从数据库构建用户的索引；构建期间如有写入则本次结果不入缓存
+
+        version 须在读取标题之前取得：之后的写入只会使版本偏旧，导致下次重建。
+        """
+        with self._lock:
+            self._building[user_id] = False
+        titles = db.session.execute(
+            db.select(Task.title).where(Task.user_id == user_id)
+        ).scalars().all()
+        index = PrefixIndex(titles, version)
+
+        with self._lock:
+            stale = self._building.pop(user_id, True)
+            if not stale and user_id not in self._indexes:
+                self._indexes[user_id] = index
+                self._size += len(index)
+                self._evict()
+        return index
+
+    def _evict(self):
+        """超出条目上限时淘汰最久未使用的用户索引（至少保留最新的一个）"""
+        while self._size > self.max_entries and len(self._indexes) > 1:
+            _, index = self._indexes.popitem(last=False)
+            self._size -= len(index)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+                self._size = 0
+            else:
+                index = self._indexes.pop(user_id, None)
+                if index is not None:
+                    self._size -= len(index)
+
+    def apply_changes(self, changes):
+        """根据已提交的任务变更增量更新已加载的索引
+
+        changes 为一次提交的全部变更，该提交使每个涉及的用户数据版本加 1。
+        """
+        with self._lock:
+            for user_id in {change.user_id for change in changes if change.entity in VERSIONED_ENTITIES}:
+                index = self._indexes.get(user_id)
+                if index is not None and index.version is not None:
+                    index.version += 1
+            for change in changes:
+                if change.entity != 'task':
+                    continue
+                if change.user_id in self._building:
+                    self._building[change.user_id] = True
+                index = self._indexes.get(change.user_id)
+                if index is None:
+                    continue
+                before = len(index)
+                if change.op in ('update', 'delete'):
+                    index.remove(change.data.get('old_title'))
+                if change.op in ('create', 'update'):
+                    index.add(change.data.get('title'))
+                self._size += len(index) - before
+            self._evict()
+
+    def on_data_changed(self, sender, changes):
+        """data_changed 信号接收函数"""
+        self.apply_changes(changes)
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._indexes), 'entries': self._size, 'max_entries': self.max_entries}
+
+
+def init_app(app):
+    """为应用创建搜索建议索引并订阅数据变更"""
+    index = SuggestionIndex(max_entries=app.config.get('SUGGEST_INDEX_MAX_ENTRIES', 200000))
+    app.extensions['task_suggestions'] = index
+    data_changed.connect(index.on_data_changed, sender=app)
+
+
+def get_suggestion_index():
+    """当前应用的搜索建议索引"""
+    return current_app.extensions['task_suggestions']
@@ -0,0 +1,139 @@
+"""
+校园待办清单系统 - 任务增量同步
+
+客户端持有同步令牌，只拉取令牌之后新建/修改（按 updated_at）和删除（按
+墓碑记录）的任务，流量与变更量成正比而与任务总数无关：
+- 任务删除（包括批量删除）在提交前根据 app.changes 收集的变更写入
+  task_tombstones，同时清理该用户超过保留期的墓碑；
+- 令牌记录 (updated_at, id) 位置，超过一页时按该位置继续；取完后令牌回退
+  SYNC_OVERLAP_SECONDS 秒，覆盖时间戳早于提交时刻的并发写入，客户端按 id
+  幂等地应用，重复收到的变更不影响结果；
+- 令牌另外记录本轮同步开始的时刻（删除水位），最后一页返回该时刻之后的
+  全部删除；位置可以很早（分页经过很久以前修改的任务），是否过期只看水位，
+  早于墓碑保留期的水位无法得知期间的删除，需要重新全量同步。
+客户端应先应用 deleted 再应用 changed（SQLite 可能复用已删除的最大 id）。
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.changes import PENDING_KEY
+from app.models import Task, TaskTombstone
+
+DEFAULT_RETENTION_DAYS = 30
+
+
+class InvalidSyncTokenError(ValueError):
+    """同步令牌无效"""
+
+
+class SyncTokenExpiredError(InvalidSyncTokenError):
+    """同步令牌早于墓碑保留期"""
+
+
+def retention():
+    days = DEFAULT_RETENTION_DAYS
+    if has_app_context():
+        days = current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', days)
+    return timedelta(days=days)
+
+
+@event.listens_for(Session, 'before_commit')
+def _record_tombstones(session):
+    session.flush()
+    changes = session.info.get(PENDING_KEY)
+    if not changes:
+        return
+    deleted = [(change.user_id, change.id) for change in changes
+               if change.entity == 'task' and change.op == 'delete']
+    removed_users = {change.id for change in changes if change.entity == 'user' and change.op == 'delete'}
+    table = TaskTombstone.__table__
+    if deleted:
+        now = datetime.utcnow()
+        session.execute(table.insert(), [
+            {'user_id': user_id, 'task_id': task_id, 'deleted_at': now} for user_id, task_id in deleted
+        ])
+        # 顺带清理这些用户超过保留期的墓碑（走 (user_id, deleted_at) 索引）
+        session.execute(table.delete().where(
+            table.c.user_id.in_({user_id for user_id, _ in deleted}),
+            table.c.deleted_at < now - retention()
+        ))
+    if removed_users:
+        session.execute(table.delete().where(table.c.user_id.in_(removed_users)))
+
+
+def compact_tombstones(now=None):
+    """删除所有用户超过保留期的墓碑，返回删除数"""
+    now = now or datetime.utcnow()
+    result = db.session.execute(
+        TaskTombstone.__table__.delete().where(TaskTombstone.deleted_at < now - retention())
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def encode_sync_token(updated_at, last_id=0, deleted_since=None):
+    """编码同步令牌：位置 (updated_at, id) 与删除水位（默认同 updated_at）"""
+    payload = {'t': updated_at.isoformat(), 'id': last_id}
+    if deleted_since is not None and deleted_since != updated_at:
+        payload['d'] = deleted_since.isoformat()
+    payload = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token):
+    """解析同步令牌，返回 (updated_at, id, 删除水位)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        updated_at = datetime.fromisoformat(payload['t'])
+        deleted_since = datetime.fromisoformat(payload['d']) if 'd' in payload else updated_at
+        return updated_at, int(payload['id']), deleted_since
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise InvalidSyncTokenError('无效的同步令牌')
+
+
+def changed_tasks_query(user_id, since_at=None, last_id=0, options=()):
+    """(updated_at, id) 位于令牌之后的任务，按同步顺序排列
+
+    条件写成 updated_at >= ? AND (...)，在 ix_tasks_user_updated 上做范围扫描。
+    """
+    query = Task.query.options(*options).filter(Task.user_id == user_id)
+    if since_at is not None:
+        query = query.filter(
+            Task.updated_at >= since_at,
+            db.or_(Task.updated_at > since_at, Task.id > last_id)
+        )
+    return query.order_by(Task.updated_at, Task.id)
+
+
+def get_changes(user_id, since=None, limit=50, options=(), now=None):
+    """返回令牌之后的变更 (changed 任务列表, deleted 任务 id 列表, 下一令牌, 是否还有更多)
+
+    since 为 None 时从头返回全部任务（全量同步）。deleted 只在最后一页返回，
+    包含本轮同步开始以来的全部删除（含已在前面页中返回的任务）。
+    """
+    now = now or datetime.utcnow()
+    overlap = timedelta(seconds=current_app.config.get('SYNC_OVERLAP_SECONDS', 5))
+    if since is None:
+        since_at, last_id, deleted_since = None, 0, now - overlap
+    else:
+        since_at, last_id, deleted_since = decode_sync_token(since)
+        if deleted_since < now - retention():
+            raise SyncTokenExpiredError('同步令牌已过期，请重新全量同步')
+
+    changed = changed_tasks_query(user_id, since_at, last_id, options).limit(limit + 1).all()
+    has_more = len(changed) > limit
+    if has_more:
+        changed = changed[:limit]
+        last = changed[-1]
+        return changed, [], encode_sync_token(last.updated_at, last.id, deleted_since), True
+
+    deleted_query = db.select(TaskTombstone.task_id).where(
+        TaskTombstone.user_id == user_id, TaskTombstone.deleted_at > deleted_since
+    ).order_by(TaskTombstone.deleted_at, TaskTombstone.id)
+    deleted = list(dict.fromkeys(db.session.scalars(deleted_query)))
+    return changed, deleted, encode_sync_token(now - overlap), False
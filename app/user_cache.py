@@ -0,0 +1,120 @@
+"""
+校园待办清单系统 - 登录用户缓存
+
+Flask-Login 在每个已登录请求中调用 load_user，原先每次都要查询一次
+users 表。这里按用户 id 缓存与会话无关的只读快照（UserSnapshot），
+用户被修改或删除的事务提交后通过 app.changes.data_changed 立即失效，
+TTL 作为多进程部署下的兜底。
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from flask_login import UserMixin
+from app import db
+from app.changes import data_changed
+from app.models import User
+
+
+class UserSnapshot(UserMixin, namedtuple('UserSnapshot', 'id username email created_at')):
+    """用户的只读快照，提供 current_user 所需的属性（不含密码哈希）"""
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(user.id, user.username, user.email, user.created_at)
+
+    def to_dict(self):
+        """转换为字典，字段与 User.to_dict() 一致"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __hash__(self):
+        # UserMixin 定义了 __eq__，需要显式提供 __hash__ 才能放入集合或作为字典键
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+
+class UserCache:
+    """按用户 id 缓存用户快照，带 TTL 与 LRU 容量上限"""
+
+    def __init__(self, ttl=300, max_size=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        # 加载期间发生的失效会使本次加载结果作废
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """返回用户快照，用户不存在时返回 None（不缓存）"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self._clock() - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_model(user)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (snapshot, self._clock())
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        """失效某个用户；user_id 为 None 时清空缓存"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._generation += 1
+
+    def on_data_changed(self, sender, changes):
+        """data_changed 信号接收函数：只关心用户的修改和删除"""
+        for change in changes:
+            if change.entity == 'user' and change.op != 'create':
+                self.invalidate(change.id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+
+def init_app(app):
+    """为应用创建用户缓存并订阅数据变更"""
+    cache = UserCache(
+        ttl=app.config.get('USER_CACHE_TTL', 300),
+        max_size=app.config.get('USER_CACHE_MAX_SIZE', 10000)
+    )
+    app.extensions['user_cache'] = cache
+    data_changed.connect(cache.on_data_changed, sender=app)
+
+
+def get_user_cache():
+    """当前应用的用户缓存"""
+    return current_app.extensions['user_cache']
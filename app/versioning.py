@@ -0,0 +1,83 @@
+"""
+校园待办清单系统 - 数据版本与条件请求
+
+每个用户维护一个单调递增的数据版本号，任务/分类的任何写入都会在同一
+事务中递增（依据 app.changes 收集的变更）。读接口据此生成 ETag，客户端
+携带 If-None-Match 且版本未变时直接返回 304，不执行列表查询也不做序列化。
+"""
+import time
+from functools import wraps
+from flask import current_app, request, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.changes import PENDING_KEY
+from app.models import UserDataVersion
+
+# 影响读接口结果的变更类型
+VERSIONED_ENTITIES = ('task', 'category')
+
+
+def bump_versions(session, user_ids):
+    """在当前事务中递增指定用户的数据版本"""
+    table = UserDataVersion.__table__
+    for user_id in sorted(user_ids):
+        result = session.execute(
+            table.update().where(table.c.user_id == user_id).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            session.execute(table.insert().values(user_id=user_id, version=1))
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_on_commit(session):
+    # 先 flush，使本事务内所有 ORM 变更都已记录
+    session.flush()
+    changes = session.info.get(PENDING_KEY)
+    if changes:
+        user_ids = {
+            UserDataVersion.GLOBAL_USER_ID if change.user_id is None else change.user_id
+            for change in changes if change.entity in VERSIONED_ENTITIES
+        }
+        if user_ids:
+            bump_versions(session, user_ids)
+
+
+def get_data_version(user_id):
+    """返回 (用户版本, 全局版本)，一次主键查询"""
+    rows = dict(db.session.execute(
+        db.select(UserDataVersion.user_id, UserDataVersion.version).where(
+            UserDataVersion.user_id.in_([user_id, UserDataVersion.GLOBAL_USER_ID])
+        )
+    ).all())
+    return rows.get(user_id, 0), rows.get(UserDataVersion.GLOBAL_USER_ID, 0)
+
+
+def data_etag(user_id):
+    """由数据版本生成 ETag
+
+    逾期/今日等字段随时间变化而非随写入变化，因此 ETag 额外包含一个
+    时间窗口（ETAG_MAX_AGE 秒），保证这类字段最多滞后一个窗口。
+    """
+    user_version, global_version = get_data_version(user_id)
+    window = int(time.time() // current_app.config['ETAG_MAX_AGE'])
+    return f'u{user_id}-v{user_version}-g{global_version}-t{window}'
+
+
+def etag_by_data_version(view):
+    """读接口装饰器：ETag 命中时直接返回 304，须放在 login_required 之后"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = data_etag(current_user.id)
+        # 弱比较：压缩后的响应使用同一 ETag 的弱校验形式
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
@@ -0,0 +1,102 @@
+"""
+基准测试 - 任务列表 JSON 序列化：逐个 to_dict() + 标准库 jsonify vs
+Task.to_dicts() + orjson 提供者
+
+任务对象在内存中构造（不含数据库查询），只比较序列化本身的耗时。
+
+用法：python -m benchmarks.bench_json [任务数] [重复次数]
+"""
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.json_provider import FastJSONProvider, orjson
+from app.models import Task, Category
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+def legacy_to_dict(task):
+    """改造前的 Task.to_dict()：逐条读取当前时间与属性"""
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'deadline': task.deadline.isoformat() if task.deadline else None,
+        'priority': task.priority,
+        'priority_label': task.priority_label,
+        'is_completed': task.is_completed,
+        'is_overdue': task.is_overdue,
+        'is_today': task.is_today,
+        'category_id': task.category_id,
+        'category_name': task.category.name if task.category else None,
+        'created_at': task.created_at.isoformat() if task.created_at else None,
+        'updated_at': task.updated_at.isoformat() if task.updated_at else None
+    }
+
+
+def make_tasks(total):
+    categories = [Category(id=i, name=f'分类{i}') for i in range(1, 6)]
+    priorities = [value for value, _ in Task.PRIORITY_CHOICES]
+    now = datetime.utcnow()
+    tasks = []
+    for i in range(total):
+        category = categories[i % 6] if i % 6 < 5 else None
+        tasks.append(Task(
+            id=i + 1,
+            title=f'任务{i}',
+            description='课程作业与复习安排' if i % 2 else None,
+            deadline=now + timedelta(hours=i % 200 - 100) if i % 3 else None,
+            priority=priorities[i % 4],
+            is_completed=i % 5 == 0,
+            category=category,
+            category_id=category.id if category else None,
+            user_id=1,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now
+        ))
+    return tasks
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    app = create_app(BenchConfig)
+    tasks = make_tasks(total)
+    providers = [('标准库', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', FastJSONProvider(app)))
+
+    print(f'{total} 个任务序列化（中位数，毫秒）')
+    with app.test_request_context():
+        dict_ms = {
+            'to_dict()': measure(lambda: [legacy_to_dict(task) for task in tasks], repeat),
+            'to_dicts()': measure(lambda: Task.to_dicts(tasks), repeat),
+        }
+        for name, ms in dict_ms.items():
+            print(f'{name:<28}{ms:>10.1f}')
+        for provider_name, provider in providers:
+            app.json = provider
+            for name, build in (('to_dict()', lambda: [legacy_to_dict(task) for task in tasks]),
+                                ('to_dicts()', lambda: Task.to_dicts(tasks))):
+                ms = measure(lambda: jsonify({'data': build()}).get_data(), repeat)
+                print(f'{name + " + " + provider_name:<28}{ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+基准测试 - 并发登录吞吐：请求线程内哈希 vs 进程池哈希
+
+同时测量登录高峰期间普通页面请求的延迟，观察哈希计算对其他请求的影响。
+
+用法：python -m benchmarks.bench_login [并发数] [每线程登录次数]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from app import create_app, db
+from app.models import User
+from config import Config
+
+USERS = 16
+
+
+def make_config(path, workers):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        PASSWORD_HASH_WORKERS = workers
+        PASSWORD_HASH_MAX_CONCURRENCY = 64
+        PASSWORD_HASH_QUEUE_TIMEOUT = 60
+    return BenchConfig
+
+
+def login_worker(app, index, count, latencies, errors):
+    client = app.test_client()
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.post('/api/users/login', json={
+            'username': f'user{index % USERS}',
+            'password': 'password123'
+        })
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        client.post('/api/users/logout')
+
+
+def probe_worker(app, stop, latencies):
+    """登录高峰期间持续请求登录页面"""
+    client = app.test_client()
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get('/login')
+        latencies.append(time.perf_counter() - start)
+
+
+def run(workers, concurrency, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db'), workers))
+        with app.app_context():
+            db.create_all()
+            for i in range(USERS):
+                user = User(username=f'user{i}', email=f'user{i}@example.com')
+                user.set_password('password123')
+                db.session.add(user)
+            db.session.commit()
+            db.session.remove()
+            # 预先启动进程池，不计入计时
+            app.extensions['password_hasher'].hash('warmup')
+
+        latencies, probes, errors = [], [], []
+        stop = threading.Event()
+        probe = threading.Thread(target=probe_worker, args=(app, stop, probes))
+        threads = [
+            threading.Thread(target=login_worker, args=(app, i, count, latencies, errors))
+            for i in range(concurrency)
+        ]
+        probe.start()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        probe.join()
+
+        app.extensions['password_hasher'].shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+        mode = f'进程池({workers})' if workers else '请求线程内'
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+        probe_ms = statistics.median(probes) * 1000 if probes else float('nan')
+        print(f'{mode:<12}{len(latencies) / elapsed:>12.1f}{p95:>14.1f}'
+              f'{probe_ms:>18.2f}{len(errors):>8}')
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f'{concurrency} 个并发线程，每线程登录 {count} 次（CPU 核数 {os.cpu_count()}）')
+    print(f'{"模式":<12}{"登录/秒":>12}{"登录P95(ms)":>14}{"页面中位数(ms)":>18}{"失败":>8}')
+    for workers in (0, max(1, Config.PASSWORD_HASH_WORKERS)):
+        run(workers, concurrency, count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+基准测试 - 任务搜索：LIKE 子串匹配 vs FTS5 全文索引
+
+用法：python -m benchmarks.bench_search [任务数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from app import create_app, db
+from app.models import User, Task
+from app.search import keyword_filter, like_filter, search_tasks
+from config import Config
+
+WORDS = ['数据结构', '操作系统', '高等数学', '大学英语', '社团活动', '实验报告',
+         '期末复习', '课程设计', 'Python', 'Java', '图书馆', '体测', '毕业论文',
+         '小组讨论', '作业', '考试', '编译原理', '计算机网络', '线性代数', '概率论']
+# 低频词：模拟课程编号等选择性较高的搜索词
+RARE_WORDS = [f'课题{i:04d}' for i in range(2000)]
+KEYWORDS = ['数据结构', '计算机网络', '课题0042', '课题1999']
+
+
+def make_config(path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return BenchConfig
+
+
+def seed(total, users):
+    """批量写入 total 条任务，平均分布在 users 个用户下"""
+    db.session.add_all([
+        User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x')
+        for i in range(users)
+    ])
+    db.session.commit()
+
+    rng = random.Random(42)
+    rows = []
+    for i in range(total):
+        rows.append({
+            'title': ''.join(rng.sample(WORDS, 2))[:50],
+            'description': ' '.join(rng.sample(WORDS, 5) + [rng.choice(RARE_WORDS)]),
+            'priority': Task.PRIORITY_IMPORTANT_NOT_URGENT,
+            'is_completed': False,
+            'user_id': i % users + 1,
+        })
+    db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(total, users, repeat=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db')))
+        with app.app_context():
+            db.create_all()
+            seed(total, users)
+
+            print(f'\n{total} 条任务 / {users} 个用户（每用户约 {total // users} 条）')
+            print(f'{"关键词":<12}{"LIKE(ms)":>12}{"FTS5(ms)":>12}{"FTS5 相关度前50(ms)":>22}')
+            for keyword in KEYWORDS:
+                like_ms = timeit(lambda: Task.query.filter(
+                    Task.user_id == 1, like_filter(keyword)
+                ).all(), repeat)
+                fts_ms = timeit(lambda: Task.query.filter(
+                    Task.user_id == 1, keyword_filter(keyword)
+                ).all(), repeat)
+                ranked_ms = timeit(lambda: search_tasks(1, keyword, 50), repeat)
+                print(f'{keyword:<12}{like_ms:>12.2f}{fts_ms:>12.2f}{ranked_ms:>22.2f}')
+            db.session.remove()
+            db.engine.dispose()
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for users in (100, 1):
+        run(total, users)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+基准测试 - 应用冷启动耗时（导入 app 包 + create_app）
+
+每次在新的子进程中测量，避免模块缓存的影响；数据库为已初始化的临时文件。
+
+用法：python -m benchmarks.bench_startup [次数]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+print((imported - start) * 1000, (created - imported) * 1000)
+"""
+
+BOOTSTRAP = """
+from app import create_app
+from app.schema import bootstrap_schema
+app = create_app()
+with app.app_context():
+    bootstrap_schema()
+"""
+
+
+def run_python(code, env):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(
+        [sys.executable, '-c', code], cwd=root, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'))
+        run_python(BOOTSTRAP, env)
+
+        imports, creates = [], []
+        for _ in range(runs):
+            import_ms, create_ms = map(float, run_python(PROBE, env).split())
+            imports.append(import_ms)
+            creates.append(create_ms)
+
+    print(f'{runs} 次冷启动（中位数 / 最小值，毫秒）')
+    print(f'{"导入 app":<14}{statistics.median(imports):>10.1f}{min(imports):>10.1f}')
+    print(f'{"create_app()":<14}{statistics.median(creates):>10.1f}{min(creates):>10.1f}')
+    total = [a + b for a, b in zip(imports, creates)]
+    print(f'{"合计":<14}{statistics.median(total):>10.1f}{min(total):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -11,5 +11,107 @@ class Config:
         'sqlite:///' + os.path.join(BASEDIR, 'campus_todo.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite 连接参数：每个新连接上执行（WAL 下读写互不阻塞）
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',           # WAL 模式下断电只可能丢失最后的事务，不会损坏数据库
+        'busy_timeout': 5000,              # 等待写锁的毫秒数
+        'mmap_size': 256 * 1024 * 1024,    # 内存映射读取
+        'cache_size': -64000,              # 页缓存约 64MB（负数单位为 KB）
+        'temp_store': 'MEMORY',
+    }
+    
+    # 文件数据库的连接池参数
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = 10
+    
+    # 启动时数据库结构版本不一致的处理方式：'warn' / 'error' / 'off'
+    SCHEMA_CHECK = os.environ.get('SCHEMA_CHECK') or 'warn'
+    
+    # 任务列表加载分类的方式：'joined'（JOIN 一次取回）或 'selectin'（额外一条 IN 查询）
+    TASK_CATEGORY_LOADING = os.environ.get('TASK_CATEGORY_LOADING') or 'joined'
+    
+    # 任务列表分页（游标分页，每页条数及API允许的最大条数）
+    TASKS_PAGE_SIZE = 50
+    TASKS_MAX_PAGE_SIZE = 200
+    
+    # “即将到期”筛选的时间范围（天），按天统计接口单次最多查询的天数
+    TASKS_UPCOMING_DAYS = 7
+    DUE_CALENDAR_MAX_DAYS = 62
+    
+    # 搜索API最多返回的结果数
+    SEARCH_RESULT_LIMIT = 50
+    
+    # 搜索建议：内存前缀索引的总条目上限（超出后按LRU淘汰用户索引）
+    SUGGEST_INDEX_MAX_ENTRIES = 200000
+    SUGGEST_LIMIT = 8
+    
+    # 导出时每批从数据库读取的任务数
+    EXPORT_BATCH_SIZE = 500
+    
+    # 批量操作API单次允许的最大操作数
+    BATCH_MAX_OPERATIONS = 200
+    
+    # 读接口 ETag 的时间窗口（秒），逾期等随时间变化的字段最多滞后该时长
+    ETAG_MAX_AGE = 60
+    
+    # 分类缓存：提交后按信号失效，TTL（秒）为多进程部署下的兜底过期时间
+    CATEGORY_CACHE_TTL = 300
+    CATEGORY_CACHE_MAX_USERS = 10000
+    
+    # 登录用户缓存：每个请求加载 current_user 时免去一次 users 查询
+    USER_CACHE_TTL = 300
+    USER_CACHE_MAX_SIZE = 10000
+    
+    # JSON 提供者：'auto' 在安装了 orjson 时使用它，'default' 使用 Flask 默认实现
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'auto'
+    
+    # 响应压缩：按 Accept-Encoding 使用 br（需安装 brotli）或 gzip，小于阈值（字节）的响应不压缩
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    # 流式响应（导出）逐块压缩
+    COMPRESS_STREAMS = True
+    COMPRESS_MIMETYPES = {
+        'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+        'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml'
+    }
+    # flask compress-static 预压缩的静态文件类型
+    COMPRESS_STATIC_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt')
+    
+    # 使用 flask build-assets 生成的哈希命名静态资源（static/dist/manifest.json 存在时）
+    ASSETS_USE_MANIFEST = True
+    
+    # 增量同步：取完变更后令牌回退的秒数（覆盖提交较晚的并发写入）、删除墓碑保留天数
+    # （早于保留期的同步令牌需要重新全量同步）
+    SYNC_OVERLAP_SECONDS = 5
+    SYNC_TOMBSTONE_RETENTION_DAYS = 30
+    
+    # 变更事件推送（SSE）：每个连接的队列长度（写满即断开慢速客户端）、每个用户的连接上限、
+    # 心跳间隔（秒）、单个连接的最长时间（秒，到期后客户端按 retry 毫秒后自动重连）
+    EVENTS_QUEUE_SIZE = 100
+    EVENTS_MAX_SUBSCRIBERS_PER_USER = 5
+    EVENTS_HEARTBEAT_SECONDS = 15
+    EVENTS_MAX_STREAM_SECONDS = 300
+    EVENTS_RETRY_MS = 3000
+    
+    # 任务列表页面缓存：按用户与数据版本缓存渲染结果，总大小上限（字节）
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    # /api/metrics/caches 暴露进程内缓存与连接统计，仅在需要排查时开启（关闭时返回 404）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+    
+    # 密码哈希：算法参数变更后用户下次登录时自动重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    PASSWORD_SALT_LENGTH = 16
+    # 哈希进程池大小（0 表示在请求线程中计算，默认为请求处理留出一个核心）、
+    # 同时在途的哈希任务上限及排队超时（秒）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, (os.cpu_count() or 1) - 1)))
+    PASSWORD_HASH_MAX_CONCURRENCY = 32
+    PASSWORD_HASH_QUEUE_TIMEOUT = 5
+    
     # 会话配置
     PERMANENT_SESSION_LIFETIME = 1800  # 30分钟超时
\ No newline at end of file
@@ -1,8 +1,15 @@
 """
 校园待办清单系统 - 启动脚本
 """
+import click
 from app import create_app, db
+from app.counters import rebuild_counters
 from app.models import User, Task, Category
+from app.schema import ensure_indexes, bootstrap_schema, SCHEMA_VERSION
+from app.search import ensure_search_index
+from app.compression import precompress_static
+from app.assets import build_assets, UnsupportedSyntaxError
+from app.sync import compact_tombstones
 
 app = create_app()
 
@@ -17,9 +24,11 @@ def make_shell_context():
     }
 
 def init_database():
-    """初始化数据库和预设分类"""
+    """初始化数据库和预设分类（结构已是最新时跳过建表）"""
     with app.app_context():
-        db.create_all()
+        previous = bootstrap_schema()
+        if previous != SCHEMA_VERSION:
+            print(f'数据库结构已初始化到版本 {SCHEMA_VERSION}')
         
         # 检查是否已有预设分类
         if Category.query.filter_by(is_preset=True).count() == 0:
@@ -34,6 +43,56 @@ def init_database():
             db.session.commit()
             print('预设分类初始化完成')
 
+@app.cli.command('init-db')
+def init_db_command():
+    """建立/升级数据库结构并写入预设分类"""
+    init_database()
+
+@app.cli.command('reconcile-counters')
+@click.option('--user-id', type=int, default=None, help='只重建指定用户的计数')
+def reconcile_counters_command(user_id):
+    """根据 tasks 表重建任务计数"""
+    rebuild_counters(user_id)
+    print('任务计数已重建')
+
+@app.cli.command('create-indexes')
+def create_indexes_command():
+    """为已有数据库补建缺失的索引"""
+    created = ensure_indexes()
+    if created:
+        print('已创建索引: ' + ', '.join(created))
+    else:
+        print('索引已是最新')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """建立/重建任务全文索引"""
+    if ensure_search_index():
+        print('全文索引重建完成')
+    else:
+        print('当前 SQLite 不支持 FTS5 trigram，搜索将使用 LIKE 查询')
+
+@app.cli.command('compact-tombstones')
+def compact_tombstones_command():
+    """清理超过保留期的任务删除墓碑"""
+    print(f'已清理 {compact_tombstones()} 条删除记录')
+
+@app.cli.command('compress-static')
+def compress_static_command():
+    """预先生成静态文件的压缩版本（.gz，安装了 brotli 时另有 .br）"""
+    written = precompress_static(app.static_folder, app.config)
+    print(f'已生成 {len(written)} 个预压缩文件')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """压缩 CSS/JS 并按内容哈希命名输出到 static/dist（重启应用后生效）"""
+    try:
+        manifest = build_assets(app.static_folder, app.config)
+    except UnsupportedSyntaxError as e:
+        raise click.ClickException(str(e))
+    for filename, target in sorted(manifest.items()):
+        print(f'{filename} -> {target}')
+
 if __name__ == '__main__':
     init_database()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,10 +1,22 @@
 """
 单元测试 - 数据模型测试
 """
+import os
+import tempfile
 import unittest
 from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from app import create_app, db
-from app.models import User, Task, Category
+from app.models import User, Task, Category, TaskCounter
+from app.routes.task import build_task_query
+from app.pagination import keyset_filter
+from app.deadlines import due_counts_by_day
+from app.counters import get_counters, upsert_statement
+from app.sync import changed_tasks_query
+from app.passwords import PasswordHasher
+from app.schema import (ensure_indexes, bootstrap_schema, check_schema_version, get_schema_version,
+                        SchemaVersionError, SCHEMA_VERSION)
 from config import Config
 
 
@@ -13,6 +25,8 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    # 每个测试都会创建应用，哈希直接在测试线程中计算，避免反复启动进程池
+    PASSWORD_HASH_WORKERS = 0
 
 
 class TestUserModel(unittest.TestCase):
@@ -78,6 +92,11 @@ class TestUserModel(unittest.TestCase):
         self.assertEqual(user_dict['username'], 'testuser')
         self.assertEqual(user_dict['email'], 'test@example.com')
         self.assertNotIn('password_hash', user_dict)
+    
+    def test_password_hash_fits_column(self):
+        """测试 scrypt 哈希不超出 password_hash 列长度"""
+        hasher = PasswordHasher(method='scrypt')
+        self.assertLessEqual(len(hasher.hash('password123')), User.password_hash.type.length)
 
 
 class TestTaskModel(unittest.TestCase):
@@ -126,6 +145,16 @@ class TestTaskModel(unittest.TestCase):
         
         self.assertEqual(task.priority_label, '紧急重要')
     
+    def test_task_priority_rank(self):
+        """测试优先级排序权重随优先级维护，未知优先级被拒绝"""
+        task = Task(title='测试任务', user_id=self.user.id, priority=Task.PRIORITY_URGENT_IMPORTANT)
+        self.assertEqual(task.priority_rank, 1)
+        task.priority = Task.PRIORITY_NOT_URGENT_NOT_IMPORTANT
+        self.assertEqual(task.priority_rank, 4)
+        
+        with self.assertRaises(ValueError):
+            task.priority = 'unknown'
+    
     def test_task_is_overdue(self):
         """测试逾期判断"""
         # 已过期任务
@@ -191,6 +220,47 @@ class TestTaskModel(unittest.TestCase):
         self.assertEqual(task_dict['priority'], 'important_not_urgent')
         self.assertEqual(task_dict['priority_label'], '重要不紧急')
         self.assertFalse(task_dict['is_completed'])
+    
+    def test_task_to_dicts(self):
+        """测试批量序列化与逐个属性计算的结果一致"""
+        category = Category(name='学习', user_id=self.user.id)
+        now = datetime.utcnow()
+        tasks = [
+            Task(title='逾期', deadline=now - timedelta(days=1), user_id=self.user.id, category=category),
+            Task(title='今日', deadline=now + timedelta(seconds=1), user_id=self.user.id),
+            Task(title='已完成', deadline=now - timedelta(days=1), is_completed=True, user_id=self.user.id),
+            Task(title='无截止', priority=Task.PRIORITY_URGENT_IMPORTANT, user_id=self.user.id),
+        ]
+        db.session.add_all(tasks)
+        db.session.commit()
+        
+        for task, data in zip(tasks, Task.to_dicts(tasks)):
+            with self.subTest(title=task.title):
+                self.assertEqual(data, task.to_dict())
+                self.assertEqual(data['is_overdue'], task.is_overdue)
+                self.assertEqual(data['priority_label'], task.priority_label)
+                self.assertEqual(data['category_name'], task.category.name if task.category else None)
+                self.assertEqual(data['created_at'], task.created_at.isoformat())
+        
+        # 传入的时间点只读取一次，整批结果基于同一时刻
+        later = Task.to_dicts(tasks, now=now + timedelta(days=2))
+        self.assertEqual([data['is_overdue'] for data in later], [True, True, False, False])
+        self.assertEqual([data['is_today'] for data in later], [False, False, False, False])
+    
+    def test_counter_upsert_dialects(self):
+        """测试计数表的合并写入语句按数据库方言生成"""
+        table = TaskCounter.__table__
+        for name, dialect, expected in (
+            ('sqlite', sqlite.dialect(), 'ON CONFLICT (user_id, category_id, priority) DO UPDATE'),
+            ('postgresql', postgresql.dialect(), 'ON CONFLICT (user_id, category_id, priority) DO UPDATE'),
+            ('mysql', mysql.dialect(), 'ON DUPLICATE KEY UPDATE'),
+        ):
+            with self.subTest(dialect=name):
+                sql = str(upsert_statement(name, table, ('total', 'completed')).compile(dialect=dialect))
+                self.assertIn(expected, sql)
+                self.assertIn('total = ', sql.replace('`', ''))
+        with self.assertRaises(NotImplementedError):
+            upsert_statement('oracle', table, ('total',))
 
 
 class TestCategoryModel(unittest.TestCase):
@@ -242,6 +312,238 @@ class TestCategoryModel(unittest.TestCase):
         
         category_dict = category.to_dict()
         self.assertEqual(category_dict['task_count'], 2)
+    
+    def test_category_task_counts_per_user(self):
+        """测试按用户批量统计分类任务数"""
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        preset = Category(name='作业', is_preset=True)
+        custom = Category(name='测试分类', user_id=self.user.id)
+        db.session.add_all([other, preset, custom])
+        db.session.commit()
+        
+        db.session.add_all([
+            Task(title='任务1', category_id=preset.id, user_id=self.user.id),
+            Task(title='任务2', category_id=custom.id, user_id=self.user.id),
+            Task(title='任务3', category_id=custom.id, user_id=self.user.id),
+            Task(title='他人任务', category_id=preset.id, user_id=other.id),
+            Task(title='未分类', user_id=self.user.id)
+        ])
+        db.session.commit()
+        
+        counts = Category.task_counts(self.user.id)
+        self.assertEqual(counts, {preset.id: 1, custom.id: 2})
+
+
+class TestTaskIndexes(unittest.TestCase):
+    """任务索引测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+    
+    def explain(self, query):
+        """返回查询的 EXPLAIN QUERY PLAN 文本"""
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        rows = db.session.connection().exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + str(compiled), params
+        ).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+    
+    def test_filter_and_sort_paths_use_index(self):
+        """测试各筛选/排序组合均命中复合索引"""
+        cases = [
+            ({}, 'ix_tasks_user_created'),
+            ({'filter_type': 'pending'}, 'ix_tasks_user_completed_created'),
+            ({'filter_type': 'completed'}, 'ix_tasks_user_completed_created'),
+            ({'filter_type': 'overdue', 'sort_by': 'deadline'}, 'ix_tasks_user_completed_deadline'),
+            ({'filter_type': 'pending', 'sort_by': 'deadline'}, 'ix_tasks_user_completed_deadline'),
+            ({'filter_type': 'today', 'sort_by': 'deadline'}, 'ix_tasks_user_completed_deadline'),
+            ({'filter_type': 'upcoming', 'sort_by': 'deadline'}, 'ix_tasks_user_completed_deadline'),
+            ({'category_id': 1}, 'ix_tasks_user_category'),
+            ({'sort_by': 'priority'}, 'ix_tasks_user_priority'),
+        ]
+        for kwargs, index_name in cases:
+            with self.subTest(**kwargs):
+                plan = self.explain(build_task_query(1, **kwargs))
+                self.assertIn('SEARCH tasks USING INDEX ' + index_name, plan)
+                # 排序也由索引提供，无需临时排序
+                self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_deadline_ranges_on_large_dataset(self):
+        """测试大数据量下今日/逾期/即将到期均为索引范围扫描，按天汇总只读覆盖索引"""
+        now = datetime.utcnow()
+        db.session.add_all([
+            User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x')
+            for i in range(50)
+        ])
+        db.session.commit()
+        rows = []
+        for i in range(20000):
+            deadline = now + timedelta(hours=(i * 7) % 2000 - 1000)
+            rows.append({
+                'title': f'任务{i}', 'user_id': i % 50 + 1, 'is_completed': i % 3 == 0,
+                'deadline': deadline, 'deadline_day': deadline.date(),
+                'created_at': now - timedelta(minutes=i)
+            })
+        db.session.execute(db.insert(Task), rows)
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        
+        # 逾期任务约占一半，按创建时间排序时规划器选择免排序的索引，不在此列
+        cases = [('today', 'created_at'), ('today', 'deadline'), ('upcoming', 'created_at'),
+                 ('upcoming', 'deadline'), ('overdue', 'deadline')]
+        for filter_type, sort_by in cases:
+            with self.subTest(filter_type=filter_type, sort_by=sort_by):
+                plan = self.explain(build_task_query(1, filter_type=filter_type, sort_by=sort_by))
+                self.assertRegex(
+                    plan, r'SEARCH tasks USING INDEX ix_tasks_user_completed_deadline '
+                          r'\(user_id=\? AND is_completed=\? AND deadline[<>]'
+                )
+        
+        start = now.date()
+        query = db.session.query(Task.deadline_day, db.func.count(Task.id)).filter(
+            Task.user_id == 1, Task.deadline_day >= start, Task.deadline_day < start + timedelta(days=7)
+        ).group_by(Task.deadline_day)
+        self.assertIn('USING COVERING INDEX ix_tasks_user_deadline_day', self.explain(query))
+        
+        # 与逐条计算的结果一致
+        counts = {item['day']: item['total'] for item in due_counts_by_day(1, start, 7)}
+        expected = {}
+        for row in rows:
+            if row['user_id'] == 1 and 0 <= (row['deadline_day'] - start).days < 7:
+                key = row['deadline_day'].isoformat()
+                expected[key] = expected.get(key, 0) + 1
+        self.assertEqual({day: total for day, total in counts.items() if total}, expected)
+    
+    def test_sync_changes_use_index(self):
+        """测试增量同步在 (user_id, updated_at) 索引上范围扫描，无需排序"""
+        plan = self.explain(changed_tasks_query(1, datetime.utcnow(), 10))
+        self.assertIn('SEARCH tasks USING INDEX ix_tasks_user_updated (user_id=? AND updated_at>?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_keyset_page_uses_index(self):
+        """测试游标翻页直接在索引上定位"""
+        query = build_task_query(1).filter(keyset_filter('created_at', datetime.utcnow(), 10))
+        plan = self.explain(query)
+        self.assertIn('ix_tasks_user_created', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_ensure_indexes_on_existing_database(self):
+        """测试为旧数据库补建索引"""
+        db.session.execute(db.text('DROP INDEX ix_tasks_user_created'))
+        db.session.commit()
+        
+        self.assertEqual(ensure_indexes(), ['ix_tasks_user_created'])
+        self.assertEqual(ensure_indexes(), [])
+
+
+class TestSchemaBootstrap(unittest.TestCase):
+    """数据库结构初始化与版本检查测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, 'test.db')
+        
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        
+        self.config = FileConfig
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+    
+    def schema_version(self):
+        with db.engine.connect() as connection:
+            return get_schema_version(connection)
+    
+    def test_create_app_does_not_create_tables(self):
+        """测试创建应用不再建表"""
+        self.assertFalse(db.inspect(db.engine).has_table('users'))
+    
+    def test_bootstrap_runs_once(self):
+        """测试初始化后写入结构版本，再次执行不做任何操作"""
+        self.assertEqual(bootstrap_schema(), 0)
+        self.assertEqual(self.schema_version(), SCHEMA_VERSION)
+        self.assertTrue(db.inspect(db.engine).has_table('tasks'))
+        
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            self.assertEqual(bootstrap_schema(), SCHEMA_VERSION)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(statements, ['PRAGMA user_version'])
+    
+    def test_check_schema_version(self):
+        """测试启动时结构版本不一致的处理"""
+        self.app.config['SCHEMA_CHECK'] = 'error'
+        with self.assertRaises(SchemaVersionError):
+            check_schema_version(self.app)
+        
+        bootstrap_schema()
+        check_schema_version(self.app)
+    
+    def test_bootstrap_upgrades_legacy_database(self):
+        """测试为未记录版本的旧库补建缺失的表和索引"""
+        db.create_all()
+        db.session.execute(db.text('DROP TABLE user_data_versions'))
+        db.session.execute(db.text('DROP INDEX ix_tasks_user_created'))
+        db.session.commit()
+        
+        self.assertEqual(bootstrap_schema(), 0)
+        inspector = db.inspect(db.engine)
+        self.assertTrue(inspector.has_table('user_data_versions'))
+        self.assertIn('ix_tasks_user_created', {ix['name'] for ix in inspector.get_indexes('tasks')})
+    
+    def test_migrate_derived_task_columns(self):
+        """测试从版本 1 升级时增加 deadline_day、priority_rank 列并回填"""
+        db.create_all()
+        for statement in ('DROP INDEX ix_tasks_user_deadline_day', 'DROP INDEX ix_tasks_user_priority',
+                          'ALTER TABLE tasks DROP COLUMN deadline_day',
+                          'ALTER TABLE tasks DROP COLUMN priority_rank'):
+            db.session.execute(db.text(statement))
+        db.session.execute(db.text(
+            "INSERT INTO users (username, email, password_hash) VALUES ('u', 'u@example.com', 'x')"
+        ))
+        db.session.execute(db.text(
+            "INSERT INTO tasks (title, user_id, deadline, priority) VALUES "
+            "('有截止', 1, '2025-03-01 23:30:00.000000', 'urgent_important'),"
+            " ('无截止', 1, NULL, 'legacy')"
+        ))
+        db.session.commit()
+        
+        bootstrap_schema()
+        rows = db.session.execute(db.select(Task.title, Task.deadline_day, Task.priority_rank)).all()
+        self.assertEqual({title: (day, rank) for title, day, rank in rows}, {
+            '有截止': (datetime(2025, 3, 1).date(), Task.PRIORITY_RANKS['urgent_important']),
+            '无截止': (None, Task.UNKNOWN_PRIORITY_RANK)
+        })
+        self.assertIn('ix_tasks_user_priority', {ix['name'] for ix in db.inspect(db.engine).get_indexes('tasks')})
+        # 版本 4 根据已有任务生成计数
+        self.assertEqual(sorted(get_counters(1)), [(None, 'legacy', 1, 0), (None, 'urgent_important', 1, 0)])
 
 
 if __name__ == '__main__':
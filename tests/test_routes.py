@@ -1,10 +1,29 @@
 """
 单元测试 - 路由测试
 """
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 import json
+from unittest import mock
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
 from app import create_app, db
-from app.models import User, Task, Category
+from app.models import User, Task, Category, TaskTombstone, UserDataVersion, load_user
+from app import search, counters, compression, assets, sync, events, json_provider
+from app.category_cache import CategoryCache
+from app.page_cache import PageCache, ENTRY_OVERHEAD
+from app.json_provider import FastJSONProvider
+from app.routes.events import event_stream
+from app.routes.task import plan_batch_operations, apply_batch_operations
+from app.passwords import PasswordHasher
 from config import Config
 
 
@@ -13,6 +32,52 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    # 每个测试都会创建应用，哈希直接在测试线程中计算，避免反复启动进程池
+    PASSWORD_HASH_WORKERS = 0
+
+
+@contextmanager
+def count_queries():
+    """统计代码块内执行的SQL语句数"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class LoggedInTestCase(unittest.TestCase):
+    """已登录测试用户的测试基类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        
+        # 创建并登录测试用户
+        self.user = User(username='testuser', email='test@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        
+        self.client.post('/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
 
 
 class TestAuthRoutes(unittest.TestCase):
@@ -121,6 +186,88 @@ class TestAuthRoutes(unittest.TestCase):
         
         self.assertEqual(response.status_code, 200)
         self.assertIn('错误', response.data.decode('utf-8'))
+    
+    def test_user_loader_cache(self):
+        """测试用户加载命中缓存，用户修改/删除后立即失效"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        
+        cache = self.app.extensions['user_cache']
+        self.assertEqual(load_user(str(user.id)).username, 'testuser')
+        with count_queries() as statements:
+            snapshot = load_user(str(user.id))
+        self.assertEqual(statements, [])
+        self.assertEqual(snapshot.get_id(), str(user.id))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        # 快照可哈希，可放入集合或作为字典键
+        self.assertEqual({snapshot, load_user(str(user.id))}, {snapshot})
+        
+        user.username = 'renamed'
+        db.session.commit()
+        self.assertEqual(load_user(str(user.id)).username, 'renamed')
+        
+        db.session.delete(user)
+        db.session.commit()
+        self.assertIsNone(load_user(str(user.id)))
+    
+    def test_login_rehashes_with_new_parameters(self):
+        """测试哈希参数变更后登录时自动重新哈希"""
+        self.app.extensions['password_hasher'] = PasswordHasher(method='pbkdf2:sha256:1000')
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:1000$'))
+        
+        self.app.extensions['password_hasher'] = PasswordHasher(method='pbkdf2:sha256:2000')
+        response = self.client.post('/api/users/login', json={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:2000$'))
+        self.assertTrue(user.check_password('password123'))
+    
+    def test_login_hasher_busy(self):
+        """测试哈希队列排队超时返回503"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        
+        hasher = PasswordHasher(max_concurrency=1, queue_timeout=0.01)
+        self.app.extensions['password_hasher'] = hasher
+        hasher._slots.acquire()
+        try:
+            response = self.client.post('/api/users/login', json={
+                'username': 'testuser',
+                'password': 'password123'
+            })
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response.headers)
+            
+            response = self.client.post('/login', data={
+                'username': 'testuser',
+                'password': 'password123'
+            })
+            self.assertEqual(response.status_code, 503)
+        finally:
+            hasher._slots.release()
+    
+    def test_password_hasher_process_pool(self):
+        """测试进程池中计算的哈希可正常验证"""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+        try:
+            pwhash = hasher.hash('password123')
+            self.assertTrue(hasher.verify(pwhash, 'password123'))
+            self.assertFalse(hasher.verify(pwhash, 'wrong'))
+            self.assertFalse(hasher.needs_rehash(pwhash))
+            self.assertTrue(PasswordHasher().needs_rehash(pwhash))
+        finally:
+            hasher.shutdown()
 
 
 class TestTaskRoutes(unittest.TestCase):
@@ -296,6 +443,32 @@ class TestTaskAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
+    def test_api_rejects_unknown_priority(self):
+        """测试写入未知优先级被拒绝"""
+        response = self.client.post('/api/tasks', json={'title': '任务', 'priority': 'whenever'})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/tasks/batch', json={'operations': [
+            {'op': 'create', 'data': {'title': '任务', 'priority': 'whenever'}}
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(json.loads(response.data)['data'][0]['success'])
+        
+        # 非字符串的优先级（列表/对象不可哈希）同样按校验失败处理
+        for priority in (['urgent_important'], {'a': 1}):
+            response = self.client.post('/api/tasks', json={'title': '任务', 'priority': priority})
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/api/tasks/batch', json={'operations': [
+                {'op': 'create', 'data': {'title': '任务', 'priority': priority}}
+            ]})
+            self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/tasks', json={'title': '任务', 'priority': 'urgent_important'})
+        task_id = json.loads(response.data)['data']['id']
+        response = self.client.put(f'/api/tasks/{task_id}', json={'priority': 'whenever'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(db.session.get(Task, task_id).priority_rank, 1)
+    
     def test_api_update_task(self):
         """测试更新任务API"""
         task = Task(title='原标题', user_id=self.user.id)
@@ -339,6 +512,255 @@ class TestTaskAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertTrue(data['data']['is_completed'])
     
+    def add_categorized_tasks(self, count):
+        """批量创建各自带分类的任务"""
+        for i in range(count):
+            category = Category(name=f'分类{i}', user_id=self.user.id)
+            db.session.add(category)
+            db.session.flush()
+            db.session.add(Task(title=f'学习任务{i}', category_id=category.id, user_id=self.user.id))
+        db.session.commit()
+        db.session.expire_all()
+    
+    def test_list_query_count_independent_of_size(self):
+        """测试列表/搜索的查询数不随任务数量增长"""
+        urls = ['/api/tasks', '/api/tasks/search?keyword=学习', '/tasks']
+        # 比较的是渲染页面本身的查询数，关闭页面缓存
+        self.app.config['PAGE_CACHE_ENABLED'] = False
+        
+        for strategy in ('joined', 'selectin'):
+            self.app.config['TASK_CATEGORY_LOADING'] = strategy
+            Task.query.delete()
+            Category.query.delete()
+            db.session.commit()
+            
+            self.add_categorized_tasks(2)
+            few = {}
+            for url in urls:
+                # 分类缓存会减少查询数，统一在冷缓存下比较
+                self.app.extensions['category_cache'].clear()
+                with count_queries() as statements:
+                    self.client.get(url)
+                few[url] = len(statements)
+            
+            self.add_categorized_tasks(20)
+            for url in urls:
+                with self.subTest(strategy=strategy, url=url):
+                    self.app.extensions['category_cache'].clear()
+                    with count_queries() as statements:
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(statements), few[url])
+        
+        data = json.loads(self.client.get('/api/tasks').data)
+        self.assertTrue(all(item['category_name'] for item in data['data']))
+    
+    def test_api_get_tasks_cursor_pagination(self):
+        """测试各排序方式下的游标分页"""
+        base = datetime(2025, 1, 1, 8, 0)
+        priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+        for i in range(8):
+            db.session.add(Task(
+                title=f'任务{i}',
+                user_id=self.user.id,
+                priority=priorities[i % 4],
+                # 制造相同的排序值与空值，验证 id 次级排序
+                created_at=base + timedelta(hours=i // 2),
+                deadline=None if i % 3 == 0 else base + timedelta(days=i % 2)
+            ))
+        db.session.commit()
+        
+        for sort in ('created_at', 'deadline', 'priority'):
+            with self.subTest(sort=sort):
+                full = json.loads(self.client.get(f'/api/tasks?sort={sort}').data)
+                self.assertIsNone(full['next_cursor'])
+                expected = [item['id'] for item in full['data']]
+                
+                paged, cursor = [], None
+                while True:
+                    url = f'/api/tasks?sort={sort}&limit=3'
+                    if cursor:
+                        url += f'&cursor={cursor}'
+                    data = json.loads(self.client.get(url).data)
+                    self.assertLessEqual(data['count'], 3)
+                    paged.extend(item['id'] for item in data['data'])
+                    cursor = data['next_cursor']
+                    if not cursor:
+                        break
+                
+                self.assertEqual(paged, expected)
+                self.assertEqual(len(paged), 8)
+    
+    def test_api_get_tasks_invalid_cursor(self):
+        """测试无效的分页游标"""
+        response = self.client.get('/api/tasks?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_task_list_load_more(self):
+        """测试任务列表页按需加载下一页"""
+        self.app.config['TASKS_PAGE_SIZE'] = 2
+        for i in range(3):
+            db.session.add(Task(title=f'分页任务{i}', user_id=self.user.id))
+        db.session.commit()
+        
+        html = self.client.get('/tasks').data.decode('utf-8')
+        self.assertEqual(html.count('task-item '), 2)
+        self.assertIn('loadMoreBtn', html)
+        # 任务数徽标显示筛选结果总数而非当前页条数
+        self.assertIn('id="taskCount">3<', html)
+        html = self.client.get('/tasks?search=分页任务1').data.decode('utf-8')
+        self.assertIn('id="taskCount">1<', html)
+        html = self.client.get('/tasks?filter=pending&category=999').data.decode('utf-8')
+        self.assertIn('id="taskCount">0<', html)
+        html = self.client.get('/tasks').data.decode('utf-8')
+        
+        cursor = html.split('data-next-cursor="')[1].split('"')[0]
+        response = self.client.get(f'/tasks?cursor={cursor}',
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+        fragment = response.data.decode('utf-8')
+        self.assertEqual(fragment.count('task-item '), 1)
+        self.assertNotIn('任务统计', fragment)
+        self.assertEqual(response.headers['X-Next-Cursor'], '')
+    
+    def test_api_stats(self):
+        """测试任务统计API"""
+        category = Category(name='测试分类', user_id=self.user.id)
+        db.session.add(category)
+        db.session.commit()
+        
+        db.session.add_all([
+            Task(title='任务1', user_id=self.user.id, category_id=category.id,
+                 priority='urgent_important'),
+            Task(title='任务2', user_id=self.user.id, is_completed=True,
+                 priority='urgent_important'),
+            Task(title='任务3', user_id=self.user.id,
+                 deadline=datetime.utcnow() - timedelta(days=1))
+        ])
+        db.session.commit()
+        
+        response = self.client.get('/api/stats')
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)['data']
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['completed'], 1)
+        self.assertEqual(data['pending'], 2)
+        self.assertEqual(data['overdue'], 1)
+        
+        by_category = {item['category_id']: item for item in data['by_category']}
+        self.assertEqual(by_category[category.id]['total'], 1)
+        self.assertEqual(by_category[None]['total'], 2)
+        
+        by_priority = {item['priority']: item for item in data['by_priority']}
+        self.assertEqual(by_priority['urgent_important']['total'], 2)
+        self.assertEqual(by_priority['urgent_important']['completed'], 1)
+        self.assertEqual(by_priority['not_urgent_not_important']['total'], 0)
+    
+    def test_task_counters_follow_writes(self):
+        """测试各类写入后任务计数与 tasks 表重建结果一致"""
+        def create(payload):
+            response = self.client.post('/api/tasks', json=payload)
+            return json.loads(response.data)['data']['id']
+        
+        response = self.client.post('/api/categories', json={'name': '课程'})
+        category_id = json.loads(response.data)['data']['id']
+        
+        first = create({'title': '任务1', 'category_id': category_id, 'priority': 'urgent_important'})
+        second = create({'title': '任务2', 'category_id': category_id})
+        third = create({'title': '任务3', 'deadline': (datetime.utcnow() - timedelta(days=1)).isoformat()})
+        self.client.post('/tasks/create', data={'title': '表单任务', 'priority': 'urgent_not_important'})
+        self.client.patch(f'/api/tasks/{first}/complete')
+        self.client.put(f'/api/tasks/{second}', json={'priority': 'not_urgent_not_important'})
+        self.client.post('/api/tasks/batch', json={'operations': [
+            {'op': 'create', 'data': {'title': '批量', 'category_id': category_id}},
+            {'op': 'update', 'id': first, 'data': {'category_id': None}},
+            {'op': 'complete', 'id': second},
+            {'op': 'delete', 'id': third},
+        ]})
+        self.client.delete(f'/api/categories/{category_id}')
+        
+        expected = sorted(counters.get_counters(self.user.id))
+        counters.rebuild_counters(self.user.id)
+        self.assertEqual(sorted(counters.get_counters(self.user.id)), expected)
+        
+        data = json.loads(self.client.get('/api/stats').data)['data']
+        self.assertEqual((data['total'], data['completed'], data['overdue']), (4, 2, 0))
+        self.assertEqual(data['by_category'], [{'category_id': None, 'total': 4, 'completed': 2}])
+        
+        # 回滚的写入不影响计数
+        db.session.add(Task(title='回滚', user_id=self.user.id))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(sorted(counters.get_counters(self.user.id)), expected)
+    
+    def test_batch_counters_use_values_at_write_time(self):
+        """测试校验与执行之间的并发写入不会使批量操作的计数偏离"""
+        ids = [json.loads(self.client.post('/api/tasks', json={'title': f'任务{i}'}).data)['data']['id']
+               for i in range(3)]
+        results, plan = plan_batch_operations(self.user.id, [
+            {'op': 'complete', 'id': ids[0]},
+            {'op': 'update', 'id': ids[1], 'data': {'priority': 'urgent_important'}},
+            {'op': 'delete', 'id': ids[2]},
+        ])
+        # 校验之后其他请求修改了这些任务
+        self.client.patch(f'/api/tasks/{ids[0]}/complete')
+        self.client.patch(f'/api/tasks/{ids[1]}/complete')
+        self.client.patch(f'/api/tasks/{ids[2]}/complete')
+        self.assertTrue(apply_batch_operations(self.user.id, plan, results))
+        
+        expected = sorted(counters.get_counters(self.user.id))
+        counters.rebuild_counters(self.user.id)
+        self.assertEqual(sorted(counters.get_counters(self.user.id)), expected)
+        data = json.loads(self.client.get('/api/stats').data)['data']
+        self.assertEqual((data['total'], data['completed']), (2, 1))
+        
+        # 目标任务在校验之后被删除：整批回滚
+        results, plan = plan_batch_operations(self.user.id, [
+            {'op': 'complete', 'id': ids[0]},
+            {'op': 'delete', 'id': ids[1]},
+        ])
+        self.client.delete(f'/api/tasks/{ids[1]}')
+        self.assertFalse(apply_batch_operations(self.user.id, plan, results))
+        self.assertEqual([result['success'] for result in results], [True, False])
+        self.assertEqual(results[1]['status'], 404)
+        self.assertFalse(db.session.get(Task, ids[0]).is_completed)
+    
+    def test_deadline_filters_and_due_calendar(self):
+        """测试今日/即将到期按 UTC 半开区间筛选，deadline_day 随写入维护"""
+        today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        tomorrow = today_start + timedelta(days=1)
+        
+        def create(title, deadline):
+            response = self.client.post('/api/tasks', json={'title': title, 'deadline': deadline.isoformat()})
+            return json.loads(response.data)['data']['id']
+        
+        create('今日零点', today_start)
+        create('昨日深夜', today_start - timedelta(seconds=1))
+        moved = create('明日零点', tomorrow)
+        self.client.post('/api/tasks/batch', json={'operations': [
+            {'op': 'create', 'data': {'title': '批量', 'deadline': tomorrow.isoformat()}}
+        ]})
+        
+        def titles(filter_type):
+            response = self.client.get(f'/api/tasks?filter={filter_type}&sort=deadline')
+            return [item['title'] for item in json.loads(response.data)['data']]
+        
+        self.assertEqual(titles('today'), ['今日零点'])
+        self.assertEqual(titles('upcoming'), ['明日零点', '批量'])
+        self.assertEqual(titles('overdue'), ['昨日深夜', '今日零点'])
+        
+        self.client.put(f'/api/tasks/{moved}', json={'deadline': today_start.isoformat()})
+        days = dict(db.session.execute(db.select(Task.title, Task.deadline_day)).all())
+        self.assertEqual(days['明日零点'], today_start.date())
+        self.assertEqual(days['批量'], tomorrow.date())
+        self.assertEqual(days['昨日深夜'], (today_start - timedelta(days=1)).date())
+        
+        response = self.client.get(f'/api/tasks/due-calendar?start={today_start.date().isoformat()}&days=3')
+        data = json.loads(response.data)['data']
+        self.assertEqual([item['total'] for item in data], [2, 1, 0])
+        self.assertEqual(self.client.get('/api/tasks/due-calendar?days=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/tasks/due-calendar?start=bad').status_code, 400)
+    
     def test_api_search_tasks(self):
         """测试搜索任务API"""
         task1 = Task(title='Python学习', user_id=self.user.id)
@@ -352,6 +774,933 @@ class TestTaskAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertEqual(data['count'], 2)
+    
+    def test_api_search_tasks_full_text(self):
+        """测试全文索引搜索及其与增删改的同步"""
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        db.session.add(other)
+        db.session.commit()
+        
+        task1 = Task(title='数据结构作业', user_id=self.user.id)
+        task2 = Task(title='复习', description='期末数据结构复习', user_id=self.user.id)
+        task3 = Task(title='数据结构实验', user_id=other.id)
+        task4 = Task(title='社团活动', user_id=self.user.id)
+        db.session.add_all([task1, task2, task3, task4])
+        db.session.commit()
+        self.assertTrue(search.fts_enabled())
+        
+        data = json.loads(self.client.get('/api/tasks/search?keyword=数据结构').data)
+        self.assertEqual({item['id'] for item in data['data']}, {task1.id, task2.id})
+        
+        data = json.loads(self.client.get('/api/tasks/search?keyword=数据结构&limit=1').data)
+        self.assertEqual(data['count'], 1)
+        
+        # 修改与删除后索引同步
+        self.client.put(f'/api/tasks/{task4.id}',
+            data=json.dumps({'title': '数据结构小组讨论'}),
+            content_type='application/json'
+        )
+        self.client.delete(f'/api/tasks/{task1.id}')
+        data = json.loads(self.client.get('/api/tasks?search=数据结构').data)
+        self.assertEqual({item['id'] for item in data['data']}, {task2.id, task4.id})
+    
+    def test_api_search_tasks_like_fallback(self):
+        """测试全文索引不可用时退回 LIKE 查询"""
+        db.session.add_all([
+            Task(title='数据结构作业', user_id=self.user.id),
+            Task(title='社团活动', user_id=self.user.id)
+        ])
+        db.session.commit()
+        
+        search._fts_enabled[db.engine] = False
+        data = json.loads(self.client.get('/api/tasks/search?keyword=数据结构').data)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['data'][0]['title'], '数据结构作业')
+    
+    def test_api_suggest_tasks(self):
+        """测试搜索建议及其增量更新"""
+        db.session.add_all([
+            Task(title='Python作业', user_id=self.user.id),
+            Task(title='python实验', user_id=self.user.id),
+            Task(title='数学作业', user_id=self.user.id)
+        ])
+        db.session.commit()
+        
+        data = json.loads(self.client.get('/api/tasks/suggest?prefix=py').data)
+        self.assertEqual(data['data'], ['Python作业', 'python实验'])
+        
+        # 索引已加载，写入后增量更新且查询不访问任务表
+        response = self.client.post('/api/tasks',
+            data=json.dumps({'title': 'Python复习'}),
+            content_type='application/json'
+        )
+        task_id = json.loads(response.data)['data']['id']
+        self.client.put(f'/api/tasks/{task_id}',
+            data=json.dumps({'title': 'PyTorch入门'}),
+            content_type='application/json'
+        )
+        with count_queries() as statements:
+            data = json.loads(self.client.get('/api/tasks/suggest?prefix=PY').data)
+        self.assertEqual(data['data'], ['Python作业', 'python实验', 'PyTorch入门'])
+        self.assertFalse(any('FROM tasks' in statement for statement in statements))
+        
+        self.client.delete(f'/api/tasks/{task_id}')
+        data = json.loads(self.client.get('/api/tasks/suggest?prefix=pyt').data)
+        self.assertEqual(data['data'], ['Python作业', 'python实验'])
+        
+        # 其他进程的写入（本进程收不到信号）：数据版本变化后重新构建
+        with db.engine.begin() as connection:
+            connection.execute(Task.__table__.update().where(
+                Task.title == '数学作业').values(title='Python期末'))
+            versions = UserDataVersion.__table__
+            connection.execute(versions.update().where(versions.c.user_id == self.user.id)
+                               .values(version=versions.c.version + 1))
+        data = json.loads(self.client.get('/api/tasks/suggest?prefix=python').data)
+        self.assertEqual(data['data'], ['Python作业', 'python实验', 'Python期末'])
+    
+    def test_suggestion_index_lru_eviction(self):
+        """测试搜索建议索引超出上限时按LRU淘汰"""
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add_all([
+            Task(title='任务A', user_id=self.user.id),
+            Task(title='任务B', user_id=other.id)
+        ])
+        db.session.commit()
+        
+        index = self.app.extensions['task_suggestions']
+        index.max_entries = 1
+        self.assertEqual(index.suggest(self.user.id, '任务'), ['任务A'])
+        self.assertEqual(index.suggest(other.id, '任务'), ['任务B'])
+        self.assertEqual(index.stats()['users'], 1)
+        self.assertEqual(index.stats()['entries'], 1)
+    
+    def test_api_export_tasks(self):
+        """测试流式导出CSV/NDJSON"""
+        category = Category(name='作业', is_preset=True)
+        db.session.add(category)
+        db.session.commit()
+        db.session.add_all([
+            Task(title='写报告', description='包含,逗号和"引号"', user_id=self.user.id,
+                 category_id=category.id, created_at=datetime(2025, 1, 1)),
+            Task(title='复习', user_id=self.user.id, is_completed=True,
+                 created_at=datetime(2025, 1, 2))
+        ])
+        db.session.commit()
+        
+        response = self.client.get('/api/tasks/export?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'ID,标题,描述,截止日期,优先级,分类,是否完成,创建时间')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith('2,复习,,,重要不紧急,,是,2025-01-02'))
+        self.assertIn('"包含,逗号和""引号"""', lines[2])
+        self.assertIn(',作业,否,', lines[2])
+        
+        response = self.client.get('/api/tasks/export?format=ndjson')
+        rows = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['复习', '写报告'])
+        self.assertEqual(rows[1]['category_name'], '作业')
+        
+        response = self.client.get('/api/tasks/export?format=xml')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_api_sparse_fields(self):
+        """测试 ?fields= 只查询并输出指定字段"""
+        category = Category(name='作业', user_id=self.user.id)
+        db.session.add(category)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(Task(title=f'任务{i}', description='长描述' * 100, user_id=self.user.id,
+                                category_id=category.id, created_at=datetime(2025, 1, 1 + i)))
+        db.session.commit()
+        
+        with count_queries() as statements:
+            response = self.client.get('/api/tasks?fields=title,is_completed&limit=2')
+        data = json.loads(response.data)
+        self.assertEqual([sorted(item) for item in data['data']], [['id', 'is_completed', 'title']] * 2)
+        self.assertEqual(data['data'][0]['title'], '任务2')
+        select = next(sql for sql in statements if 'FROM tasks' in sql)
+        self.assertNotIn('tasks.description', select)
+        self.assertNotIn('categories', select)
+        
+        # 游标分页所需的排序列会一并查询
+        response = self.client.get(f'/api/tasks?fields=title&limit=2&cursor={data["next_cursor"]}')
+        self.assertEqual([item['title'] for item in json.loads(response.data)['data']], ['任务0'])
+        
+        data = json.loads(self.client.get('/api/tasks?fields=category_name,is_overdue&sort=deadline').data)
+        self.assertEqual(data['data'][0], {'id': data['data'][0]['id'], 'category_name': '作业',
+                                           'is_overdue': False})
+        
+        data = json.loads(self.client.get('/api/tasks/search?keyword=任务1&fields=title').data)
+        self.assertEqual(data['data'], [{'id': data['data'][0]['id'], 'title': '任务1'}])
+        
+        response = self.client.get('/api/tasks?fields=title,password_hash')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password_hash', json.loads(response.data)['error'])
+    
+    def test_task_list_loads_description_preview(self):
+        """测试任务列表页在 SQL 中截取描述摘要"""
+        db.session.add_all([
+            Task(title='长描述', description='甲' * 150 + '乙', user_id=self.user.id),
+            Task(title='短描述', description='丙' * 100, user_id=self.user.id),
+        ])
+        db.session.commit()
+        
+        self.app.config['PAGE_CACHE_ENABLED'] = False
+        with count_queries() as statements:
+            html = self.client.get('/tasks').data.decode('utf-8')
+        self.assertIn('甲' * 100 + '...', html)
+        self.assertNotIn('甲' * 101, html)
+        self.assertIn('丙' * 100 + '</p>', html)
+        select = next(sql for sql in statements if 'FROM tasks' in sql)
+        self.assertIn('substr(tasks.description', select)
+        self.assertNotIn('tasks.description AS', select)
+    
+    def test_api_batch_tasks(self):
+        """测试批量操作在同一事务中执行"""
+        old_time = datetime(2025, 1, 1)
+        task1 = Task(title='待更新', user_id=self.user.id, updated_at=old_time)
+        task2 = Task(title='待完成', user_id=self.user.id)
+        task3 = Task(title='待切换', user_id=self.user.id, is_completed=True)
+        task4 = Task(title='待删除', user_id=self.user.id)
+        db.session.add_all([task1, task2, task3, task4])
+        db.session.commit()
+        ids = [task1.id, task2.id, task3.id, task4.id]
+        
+        operations = [
+            {'op': 'create', 'data': {'title': '批量新建1', 'priority': 'urgent_important'}},
+            {'op': 'create', 'data': {'title': '批量新建2'}},
+            {'op': 'update', 'id': ids[0], 'data': {'title': '已更新标题'}},
+            {'op': 'complete', 'id': ids[1], 'is_completed': True},
+            {'op': 'complete', 'id': ids[2]},
+            {'op': 'delete', 'id': ids[3]}
+        ]
+        with count_queries() as statements:
+            response = self.client.post('/api/tasks/batch',
+                data=json.dumps({'operations': operations}),
+                content_type='application/json'
+            )
+        # 语句数与操作数量无关（含执行前锁定目标任务的一条语句）
+        self.assertLess(len(statements), 16)
+        
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['data']
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(results[0]['data']['title'], '批量新建1')
+        self.assertEqual(results[0]['data']['priority'], 'urgent_important')
+        self.assertEqual(results[2]['data']['title'], '已更新标题')
+        self.assertTrue(results[3]['data']['is_completed'])
+        self.assertFalse(results[4]['data']['is_completed'])
+        self.assertNotIn('data', results[5])
+        
+        db.session.expire_all()
+        self.assertIsNone(db.session.get(Task, ids[3]))
+        self.assertGreater(db.session.get(Task, ids[0]).updated_at, old_time)
+        self.assertEqual(Task.query.filter_by(user_id=self.user.id).count(), 5)
+        
+        # 全文索引与搜索建议同步
+        data = json.loads(self.client.get('/api/tasks/search?keyword=已更新标题').data)
+        self.assertEqual(data['count'], 1)
+        data = json.loads(self.client.get('/api/tasks/suggest?prefix=批量').data)
+        self.assertEqual(data['data'], ['批量新建1', '批量新建2'])
+    
+    def test_api_batch_tasks_validation_is_atomic(self):
+        """测试批量操作任一项校验失败时整批不执行"""
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        db.session.add(other)
+        db.session.commit()
+        others_task = Task(title='他人任务', user_id=other.id)
+        db.session.add(others_task)
+        db.session.commit()
+        
+        response = self.client.post('/api/tasks/batch',
+            data=json.dumps({'operations': [
+                {'op': 'create', 'data': {'title': '合法任务'}},
+                {'op': 'create', 'data': {'title': 'a' * 51}},
+                {'op': 'delete', 'id': others_task.id},
+                {'op': 'archive', 'id': 1}
+            ]}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        results = json.loads(response.data)['data']
+        self.assertEqual([result['success'] for result in results], [True, False, False, False])
+        self.assertEqual(results[2]['status'], 404)
+        self.assertEqual(Task.query.filter_by(user_id=self.user.id).count(), 0)
+        self.assertIsNotNone(db.session.get(Task, others_task.id))
+    
+    def test_api_etag_not_modified(self):
+        """测试数据版本未变时返回304且不执行列表查询"""
+        db.session.add(Task(title='测试任务', user_id=self.user.id))
+        db.session.commit()
+        
+        response = self.client.get('/api/tasks')
+        etag = response.headers['ETag']
+        self.assertEqual(response.status_code, 200)
+        
+        with count_queries() as statements:
+            response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertFalse(any('FROM tasks' in statement for statement in statements))
+        
+        # 其他用户的写入不影响本用户的版本
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(Task(title='他人任务', user_id=other.id))
+        db.session.commit()
+        response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        
+        # 本用户写入后版本递增
+        self.client.post('/api/tasks',
+            data=json.dumps({'title': '新任务'}),
+            content_type='application/json'
+        )
+        response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(json.loads(response.data)['count'], 2)
+    
+    def test_api_categories_etag(self):
+        """测试分类写入使分类列表ETag失效"""
+        etag = self.client.get('/api/categories').headers['ETag']
+        
+        response = self.client.get('/api/categories', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        
+        self.client.post('/api/categories',
+            data=json.dumps({'name': '新分类'}),
+            content_type='application/json'
+        )
+        response = self.client.get('/api/categories', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+class TestJSONProvider(LoggedInTestCase):
+    """JSON 提供者测试"""
+    
+    @unittest.skipUnless(json_provider.orjson, '未安装 orjson')
+    def test_json_provider(self):
+        """测试 orjson 提供者与 Flask 默认实现输出相同的 JSON 内容"""
+        self.assertIsInstance(self.app.json, FastJSONProvider)
+        default = DefaultJSONProvider(self.app)
+        payload = {'b': [1, 2.5, None, True], 'a': '中文', 'when': datetime(2025, 1, 2, 3, 4, 5),
+                   'day': date(2025, 1, 2), 'big': 2 ** 70}
+        
+        self.assertEqual(json.loads(self.app.json.dumps(payload)), json.loads(default.dumps(payload)))
+        self.assertEqual(self.app.json.dumps({'b': 1, 'a': 2}), '{"a":2,"b":1}')
+        self.assertEqual(self.app.json.dumps({2: 'x', 1: 'y'}), '{"1":"y","2":"x"}')
+        self.assertEqual(self.app.json.loads('{"a": [1]}'), {'a': [1]})
+        with self.app.test_request_context():
+            response = jsonify(payload)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(json.loads(response.data), json.loads(default.dumps(payload)))
+            self.assertEqual(jsonify(data=[1]).data, b'{"data":[1]}\n')
+        
+        self.client.post('/api/tasks', json={'title': '中文任务'})
+        data = json.loads(self.client.get('/api/tasks').data)
+        self.assertEqual(data['data'][0]['title'], '中文任务')
+    
+    def test_json_provider_fallback(self):
+        """测试未安装 orjson 或配置为 default 时使用 Flask 默认实现"""
+        class DefaultJSONConfig(TestConfig):
+            JSON_PROVIDER = 'default'
+        
+        with mock.patch.object(json_provider, 'orjson', None):
+            apps = [create_app(TestConfig), create_app(DefaultJSONConfig)]
+        for app in apps:
+            self.assertNotIsInstance(app.json, FastJSONProvider)
+            self.assertEqual(app.json.dumps({'b': 1, 'a': 2}), '{"a": 2, "b": 1}')
+        
+        # 导出等使用 ensure_ascii=False 的调用在默认实现下同样可用
+        self.app.json = DefaultJSONProvider(self.app)
+        self.client.post('/api/tasks', json={'title': '中文任务'})
+        response = self.client.get('/api/tasks/export?format=ndjson')
+        self.assertIn('中文任务', response.get_data(as_text=True))
+
+
+class TestDeltaSync(LoggedInTestCase):
+    """任务增量同步测试"""
+    
+    def test_api_task_changes(self):
+        """测试增量同步只返回令牌之后的新建/修改/删除"""
+        old = datetime.utcnow() - timedelta(hours=1)
+        tasks = [Task(title=f'任务{i}', user_id=self.user.id, created_at=old, updated_at=old)
+                 for i in range(4)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        ids = [task.id for task in tasks]
+        
+        # 全量同步分页
+        first = json.loads(self.client.get('/api/tasks/changes?limit=3').data)
+        self.assertTrue(first['has_more'])
+        second = json.loads(self.client.get(f'/api/tasks/changes?limit=3&since={first["next_since"]}').data)
+        self.assertFalse(second['has_more'])
+        synced = [item['id'] for item in first['data']['changed'] + second['data']['changed']]
+        self.assertEqual(sorted(synced), ids)
+        
+        # 没有变更时不返回任务
+        since = second['next_since']
+        data = json.loads(self.client.get(f'/api/tasks/changes?since={since}').data)
+        self.assertEqual(data['data'], {'changed': [], 'deleted': []})
+        
+        created = json.loads(self.client.post('/api/tasks', json={'title': '新任务'}).data)['data']['id']
+        self.client.put(f'/api/tasks/{ids[0]}', json={'title': '已修改'})
+        self.client.delete(f'/api/tasks/{ids[1]}')
+        self.client.post('/api/tasks/batch', json={'operations': [
+            {'op': 'complete', 'id': ids[2], 'is_completed': True},
+            {'op': 'delete', 'id': ids[3]},
+        ]})
+        
+        data = json.loads(self.client.get(f'/api/tasks/changes?since={since}&fields=title,is_completed').data)
+        changed = {item['id']: item for item in data['data']['changed']}
+        self.assertEqual(set(changed), {ids[0], ids[2], created})
+        self.assertEqual(changed[ids[0]], {'id': ids[0], 'title': '已修改', 'is_completed': False})
+        self.assertTrue(changed[ids[2]]['is_completed'])
+        self.assertEqual(sorted(data['data']['deleted']), [ids[1], ids[3]])
+        
+        # 令牌回退重叠窗口：再次拉取会重复收到最近的变更（客户端幂等应用）
+        again = json.loads(self.client.get(f'/api/tasks/changes?since={data["next_since"]}').data)
+        self.assertEqual(len(again['data']['changed']), 3)
+        self.app.config['SYNC_OVERLAP_SECONDS'] = 0
+        token = json.loads(self.client.get(f'/api/tasks/changes?since={since}').data)['next_since']
+        again = json.loads(self.client.get(f'/api/tasks/changes?since={token}').data)
+        self.assertEqual(again['data'], {'changed': [], 'deleted': []})
+        
+        response = self.client.get('/api/tasks/changes?since=not-a-token')
+        self.assertEqual(response.status_code, 400)
+        expired = sync.encode_sync_token(datetime.utcnow() - timedelta(days=31))
+        response = self.client.get(f'/api/tasks/changes?since={expired}')
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(json.loads(response.data)['resync'])
+    
+    def test_api_task_changes_pages_through_old_tasks(self):
+        """测试分页位置早于墓碑保留期时仍能继续，删除在最后一页返回"""
+        old = datetime.utcnow() - timedelta(days=60)
+        tasks = [Task(title=f'任务{i}', user_id=self.user.id, created_at=old, updated_at=old)
+                 for i in range(5)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        ids = [task.id for task in tasks]
+        
+        synced, deleted, since = [], [], None
+        for page in range(3):
+            url = '/api/tasks/changes?limit=2' + (f'&since={since}' if since else '')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            synced += [item['id'] for item in data['data']['changed']]
+            deleted += data['data']['deleted']
+            since = data['next_since']
+            if page == 0:
+                # 同步过程中删除已返回的任务
+                self.client.delete(f'/api/tasks/{ids[0]}')
+        self.assertFalse(data['has_more'])
+        self.assertEqual(sorted(synced), ids)
+        self.assertEqual(deleted, [ids[0]])
+    
+    def test_tombstone_compaction(self):
+        """测试删除时清理该用户过期的墓碑，compact_tombstones 清理全部用户"""
+        old = datetime.utcnow() - timedelta(days=40)
+        db.session.add_all([
+            TaskTombstone(user_id=self.user.id, task_id=1000, deleted_at=old),
+            TaskTombstone(user_id=self.user.id + 1, task_id=1001, deleted_at=old),
+        ])
+        task = Task(title='待删除', user_id=self.user.id)
+        db.session.add(task)
+        db.session.commit()
+        
+        self.client.delete(f'/api/tasks/{task.id}')
+        remaining = db.session.execute(db.select(TaskTombstone.user_id, TaskTombstone.task_id)).all()
+        self.assertEqual(sorted(remaining), [(self.user.id, task.id), (self.user.id + 1, 1001)])
+        
+        self.assertEqual(sync.compact_tombstones(), 1)
+        self.assertEqual(db.session.query(TaskTombstone).count(), 1)
+
+
+class TestChangeEvents(LoggedInTestCase):
+    """变更事件推送测试"""
+    
+    def test_api_events_stream(self):
+        """测试写入提交后向该用户的事件流推送变更"""
+        response = self.client.get('/api/events', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        stream = (chunk.decode('utf-8') for chunk in response.response)
+        self.assertIn(': connected', next(stream))
+        
+        hub = self.app.extensions['event_hub']
+        other = hub.subscribe(self.user.id + 1)
+        created = json.loads(self.client.post(
+            '/api/tasks', json={'title': '推送任务'}, headers={'X-Client-Id': 'tab-1'}
+        ).data)['data']['id']
+        message = next(stream)
+        self.assertIn('event: changes', message)
+        event = json.loads(message.split('data: ', 1)[1])
+        self.assertEqual(event['origin'], 'tab-1')
+        self.assertEqual([(c['entity'], c['op'], c['id']) for c in event['changes']],
+                         [('task', 'create', created)])
+        # 其他用户收不到
+        self.assertIsNone(other.get(timeout=0))
+        
+        response.close()
+        self.assertEqual(hub.stats()['subscribers'], 1)
+    
+    def test_event_hub_backpressure(self):
+        """测试读取过慢的订阅被断开，发布方不阻塞"""
+        hub = events.EventHub(queue_size=2, max_subscribers_per_user=2)
+        slow, fast = hub.subscribe(1), hub.subscribe(1)
+        for i in range(3):
+            hub.publish(1, {'n': i})
+            fast.get(timeout=0)
+        with self.assertRaises(events.SubscriberClosed) as cm:
+            slow.get(timeout=0)
+        self.assertEqual(cm.exception.reason, 'slow')
+        self.assertEqual(hub.stats(), {'users': 1, 'subscribers': 1, 'published': 3, 'dropped': 1})
+        
+        # 超过每用户连接数时替换最早的连接；user_id 为 None 时广播
+        newer, newest = hub.subscribe(1), hub.subscribe(1)
+        with self.assertRaises(events.SubscriberClosed):
+            fast.get(timeout=0)
+        hub.publish(None, {'n': 'all'})
+        self.assertEqual(newest.get(timeout=0)['n'], 'all')
+        
+        # 空闲时流输出心跳，关闭后输出 reset 并退订
+        stream = event_stream(hub, newer, heartbeat=0, max_seconds=60, retry_ms=1000)
+        self.assertTrue(next(stream).startswith('retry: 1000'))
+        newer.get(timeout=0)
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        newer.close('shutdown')
+        self.assertIn('event: reset', next(stream))
+        self.assertEqual(list(stream), [])
+        self.assertEqual(hub.stats()['subscribers'], 1)
+
+
+class TestCategoryAPI(unittest.TestCase):
+    """分类API测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        
+        # 创建并登录测试用户
+        self.user = User(username='testuser', email='test@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        
+        self.client.post('/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+    
+    def add_categories(self, count):
+        """批量创建带任务的分类"""
+        for i in range(count):
+            category = Category(name=f'分类{i}', user_id=self.user.id)
+            db.session.add(category)
+            db.session.flush()
+            db.session.add(Task(title=f'任务{i}', category_id=category.id, user_id=self.user.id))
+        db.session.commit()
+    
+    def test_api_get_categories_query_count(self):
+        """测试分类列表的查询数不随分类数量增长"""
+        cache = self.app.extensions['category_cache']
+        self.add_categories(2)
+        cache.clear()
+        with count_queries() as few:
+            response = self.client.get('/api/categories')
+        self.assertEqual(response.status_code, 200)
+        
+        self.add_categories(10)
+        cache.clear()
+        with count_queries() as many:
+            response = self.client.get('/api/categories')
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 12)
+        self.assertTrue(all(item['task_count'] == 1 for item in data['data']))
+        self.assertEqual(len(few), len(many))
+    
+    def test_category_cache_invalidation(self):
+        """测试分类缓存命中后不再查询分类表，增删分类后立即失效"""
+        self.client.get('/api/categories')
+        with count_queries() as statements:
+            self.client.get('/api/categories')
+        self.assertFalse(any('FROM categories' in sql for sql in statements))
+        
+        self.client.post('/api/categories', json={'name': '社团'})
+        data = json.loads(self.client.get('/api/categories').data)
+        self.assertEqual([item['name'] for item in data['data']], ['社团'])
+        
+        category_id = data['data'][0]['id']
+        self.client.post(f'/categories/{category_id}/delete')
+        data = json.loads(self.client.get('/api/categories').data)
+        self.assertEqual(data['count'], 0)
+        
+        # 预设分类变更使所有用户的预设层失效
+        db.session.add(Category(name='学习', is_preset=True))
+        db.session.commit()
+        data = json.loads(self.client.get('/api/categories').data)
+        self.assertEqual([item['name'] for item in data['data']], ['学习'])
+    
+    def test_category_cache_ttl(self):
+        """测试绕过 ORM 的写入在 TTL 过期后可见"""
+        now = [0.0]
+        cache = CategoryCache(ttl=10, clock=lambda: now[0])
+        self.assertEqual(cache.get_user_categories(self.user.id), ())
+        
+        db.session.execute(db.insert(Category).values(name='社团', user_id=self.user.id))
+        db.session.commit()
+        self.assertEqual(cache.get_user_categories(self.user.id), ())
+        
+        now[0] = 11
+        records = cache.get_user_categories(self.user.id)
+        self.assertEqual([record.name for record in records], ['社团'])
+        self.assertEqual(cache.stats()['hits'], 1)
+    
+    def test_page_cache(self):
+        """测试任务列表页面缓存的命中、写入失效与闪现消息跳过"""
+        self.client.get('/tasks')  # 取走登录时的闪现消息
+        self.assertEqual(self.client.get('/tasks').headers['X-Page-Cache'], 'miss')
+        with count_queries() as statements:
+            response = self.client.get('/tasks')
+        self.assertEqual(response.headers['X-Page-Cache'], 'hit')
+        self.assertEqual(len(statements), 1)  # 只读取数据版本
+        
+        # 不同筛选条件各自缓存
+        self.assertEqual(self.client.get('/tasks?filter=today').headers['X-Page-Cache'], 'miss')
+        
+        # 写入后该用户的页面全部失效，新页面包含新任务
+        self.client.post('/api/tasks', json={'title': '新任务'})
+        self.assertEqual(self.app.extensions['page_cache'].stats()['entries'], 0)
+        response = self.client.get('/tasks')
+        self.assertEqual(response.headers['X-Page-Cache'], 'miss')
+        self.assertIn('新任务', response.data.decode('utf-8'))
+        
+        # 有待显示的闪现消息时不使用缓存
+        self.client.post('/categories/create', data={'name': '社团'})
+        response = self.client.get('/tasks')
+        self.assertNotIn('X-Page-Cache', response.headers)
+        
+        # 统计接口默认关闭
+        self.assertEqual(self.client.get('/api/metrics/caches').status_code, 404)
+        self.app.config['METRICS_ENABLED'] = True
+        data = json.loads(self.client.get('/api/metrics/caches').data)['data']
+        self.assertEqual(data['page']['hits'], 1)
+        self.assertIn('hit_ratio', data['user'])
+    
+    def test_page_cache_memory_limit(self):
+        """测试页面缓存按字节数上限淘汰最久未使用的页面"""
+        cache = PageCache(max_bytes=3 * (100 + ENTRY_OVERHEAD))
+        for key in ('a', 'b', 'c'):
+            cache.set((1, key), b'x' * 100)
+        cache.get((1, 'a'))
+        cache.set((2, 'd'), b'x' * 100)
+        
+        self.assertIsNone(cache.get((1, 'b')))
+        self.assertIsNotNone(cache.get((1, 'a')))
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (3, 1))
+        self.assertLessEqual(stats['bytes'], stats['max_bytes'])
+        
+        cache.invalidate(1)
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.set((3, 'big'), b'x' * stats['max_bytes'])
+        self.assertIsNone(cache.get((3, 'big')))
+
+
+class TestResponseCompression(LoggedInTestCase):
+    """响应压缩测试"""
+    
+    def test_response_compression(self):
+        """测试按 Accept-Encoding 压缩响应（阈值、ETag、流式导出）"""
+        for i in range(30):
+            db.session.add(Task(title=f'压缩测试任务{i}', user_id=self.user.id))
+        db.session.commit()
+        gzip_headers = {'Accept-Encoding': 'gzip, deflate'}
+        
+        plain = self.client.get('/api/tasks')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        
+        response = self.client.get('/api/tasks', headers=gzip_headers)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        body = gzip.decompress(response.data)
+        self.assertEqual(json.loads(body), json.loads(plain.data))
+        self.assertLess(len(response.data), len(body) // 3)
+        
+        # 压缩后的 ETag 为弱校验形式，条件请求仍可命中
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+        response = self.client.get('/api/tasks', headers={
+            **gzip_headers, 'If-None-Match': response.headers['ETag']
+        })
+        self.assertEqual(response.status_code, 304)
+        
+        # 小于阈值的响应、不接受压缩的编码不压缩
+        response = self.client.get('/api/tasks?limit=1&fields=title', headers=gzip_headers)
+        self.assertNotIn('Content-Encoding', response.headers)
+        response = self.client.get('/api/tasks', headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        
+        response = self.client.get('/api/tasks/export?format=ndjson', headers=gzip_headers)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 30)
+    
+    @unittest.skipUnless(compression.brotli, '未安装 brotli')
+    def test_response_compression_brotli(self):
+        """测试同时接受 br 与 gzip 时优先使用 brotli"""
+        for i in range(30):
+            db.session.add(Task(title=f'压缩测试任务{i}', user_id=self.user.id))
+        db.session.commit()
+        response = self.client.get('/api/tasks', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.data))['count'], 30)
+    
+    def test_precompressed_static_files(self):
+        """测试静态文件发送预先生成的压缩版本"""
+        with tempfile.TemporaryDirectory() as static_folder:
+            source = os.path.join(static_folder, 'app.css')
+            with open(source, 'w') as f:
+                f.write('body { color: #333; }\n' * 100)
+            self.app.static_folder = static_folder
+            
+            written = compression.precompress_static(static_folder, self.app.config)
+            self.assertIn(source + '.gz', written)
+            
+            response = self.client.get('/static/app.css', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(response.mimetype, 'text/css')
+            with open(source, 'rb') as f:
+                self.assertEqual(gzip.decompress(response.data), f.read())
+            response.close()
+            
+            response = self.client.get('/static/app.css')
+            self.assertNotIn('Content-Encoding', response.headers)
+            response.close()
+            
+            # 原文件更新后预压缩文件过期，不再使用
+            os.utime(source + '.gz', (0, 0))
+            response = self.client.get('/static/app.css', headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+            response.close()
+
+
+class TestStaticAssets(unittest.TestCase):
+    """哈希命名静态资源测试"""
+    
+    def setUp(self):
+        """测试前准备：在临时目录中构建静态资源"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.static_folder = os.path.join(self.tmpdir.name, 'static')
+        self.app = create_app(TestConfig)
+        shutil.copytree(self.app.static_folder, self.static_folder,
+                        ignore=shutil.ignore_patterns('dist', '*.gz', '*.br'))
+        self.manifest = assets.build_assets(self.static_folder, self.app.config)
+        self.app.static_folder = self.static_folder
+        assets.init_app(self.app)
+        self.client = self.app.test_client()
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.tmpdir.cleanup()
+    
+    def test_hashed_assets(self):
+        """测试页面引用哈希文件名，哈希文件长期缓存"""
+        self.assertEqual(set(self.manifest), {'css/style.css', 'js/main.js'})
+        html = self.client.get('/login').data.decode('utf-8')
+        for filename, target in self.manifest.items():
+            self.assertRegex(target, r'^dist/.+\.[0-9a-f]{12}\.(css|js)$')
+            self.assertIn(f'/static/{target}', html)
+            self.assertNotIn(f'/static/{filename}"', html)
+        
+        url = '/static/' + self.manifest['js/main.js']
+        response = self.client.get(url)
+        self.assertEqual(response.headers['Cache-Control'], assets.IMMUTABLE_CACHE_CONTROL)
+        minified = response.data
+        response.close()
+        with open(os.path.join(self.static_folder, 'js', 'main.js'), 'rb') as f:
+            self.assertLess(len(minified), len(f.read()) * 0.8)
+        
+        # 预压缩版本同样长期缓存
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], assets.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(gzip.decompress(response.data), minified)
+        response.close()
+        
+        # 未构建的原文件不设置长期缓存
+        response = self.client.get('/static/js/main.js')
+        self.assertNotEqual(response.headers.get('Cache-Control'), assets.IMMUTABLE_CACHE_CONTROL)
+        response.close()
+    
+    def test_stale_manifest_entries_ignored(self):
+        """测试构建后修改过的源文件不再使用旧的哈希文件"""
+        source = os.path.join(self.static_folder, 'css', 'style.css')
+        os.utime(source, (time.time() + 60, time.time() + 60))
+        self.assertEqual(set(assets.load_manifest(self.static_folder)), {'js/main.js'})
+    
+    def test_minify_preserves_strings(self):
+        """测试内置压缩保留字符串字面量、删除注释"""
+        js = "// 注释\nvar url = 'http://a/*b*/';  /* 块注释 */\nvar s = \"a  b\" + x;\n"
+        self.assertEqual(assets.minify_js(js), "var url='http://a/*b*/';var s=\"a  b\" + x;")
+        css = "@media (max-width: 768px) {\n  a :hover { content: \"a ; b\"; }\n}"
+        self.assertEqual(assets.minify_css(css),
+                         '@media (max-width:768px){a :hover{content:"a ; b"}}')
+    
+    @unittest.skipIf(assets.rjsmin, '已安装 rjsmin')
+    def test_build_fails_on_unsupported_js(self):
+        """测试内置压缩遇到正则字面量、嵌套模板字符串时构建失败而不是输出错误的文件"""
+        for source in ('var quotes = /"/g;\n', 'var s = `${`x`}`;\n', 'var half = total / 2;\n'):
+            with self.subTest(source=source):
+                with self.assertRaises(assets.UnsupportedSyntaxError):
+                    assets.minify_js(source)
+        
+        with open(os.path.join(self.static_folder, 'js', 'main.js'), 'a', encoding='utf-8') as f:
+            f.write('var quotes = /"/g;\n')
+        manifest_path = os.path.join(self.static_folder, assets.DIST_DIR, assets.MANIFEST_NAME)
+        built_at = os.path.getmtime(manifest_path)
+        with self.assertRaises(assets.UnsupportedSyntaxError) as cm:
+            assets.build_assets(self.static_folder, self.app.config)
+        self.assertIn('js/main.js', str(cm.exception))
+        self.assertEqual(os.path.getmtime(manifest_path), built_at)
+
+
+class TestSQLiteConcurrency(unittest.TestCase):
+    """SQLite 文件数据库并发读写测试"""
+    
+    THREADS = 8
+    ROUNDS = 15
+    
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.tmpdir.name, 'test.db')
+            PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        
+        for i in range(self.THREADS):
+            user = User(username=f'user{i}', email=f'user{i}@example.com')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.commit()
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+    
+    def test_connection_pragmas(self):
+        """测试新连接上应用了 SQLite 参数"""
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+            self.assertEqual(connection.exec_driver_sql('PRAGMA synchronous').scalar(), 1)
+            self.assertEqual(connection.exec_driver_sql('PRAGMA busy_timeout').scalar(), 5000)
+        self.assertEqual(db.engine.pool.size(), self.app.config['DB_POOL_SIZE'])
+    
+    def test_concurrent_reads_and_writes(self):
+        """测试多线程混合读写不出现 database is locked"""
+        errors = []
+        
+        def worker(index):
+            client = self.app.test_client()
+            try:
+                client.post('/api/users/login', json={
+                    'username': f'user{index}',
+                    'password': 'password123'
+                })
+                response = client.post('/api/tasks', json={'title': f'任务{index}'})
+                task_id = json.loads(response.data)['data']['id']
+                for _ in range(self.ROUNDS):
+                    for response in (
+                        client.get('/api/tasks'),
+                        client.patch(f'/api/tasks/{task_id}/complete'),
+                        client.get('/api/stats'),
+                        client.post('/api/tasks', json={'title': '并发写入'}),
+                    ):
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(Task.query.count(), self.THREADS * (self.ROUNDS + 1))
+    
+    def test_concurrent_writes_keep_counters(self):
+        """测试两个请求读取同一任务后并发切换/删除，计数与重建结果一致"""
+        user = User.query.filter_by(username='user0').first()
+        tasks = [Task(title='并发切换', user_id=user.id), Task(title='并发删除', user_id=user.id)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        toggled, deleted = [task.id for task in tasks]
+        
+        clients = []
+        for _ in range(2):
+            client = self.app.test_client()
+            client.post('/api/users/login', json={'username': 'user0', 'password': 'password123'})
+            clients.append(client)
+        
+        # 两个请求都读取任务之后才继续，确保基于同一份旧值写入
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def wait_for_other(target, context):
+            barrier.wait()
+        
+        for request_task in (lambda client: client.patch(f'/api/tasks/{toggled}/complete'),
+                             lambda client: client.delete(f'/api/tasks/{deleted}')):
+            barrier.reset()
+            event.listen(Task, 'load', wait_for_other)
+            try:
+                threads = [threading.Thread(target=request_task, args=(client,)) for client in clients]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                event.remove(Task, 'load', wait_for_other)
+        
+        expected = sorted(counters.get_counters(user.id))
+        counters.rebuild_counters(user.id)
+        self.assertEqual(sorted(counters.get_counters(user.id)), expected)
+        self.assertEqual(expected, [(None, 'important_not_urgent', 1, 1)])
 
 
 if __name__ == '__main__':